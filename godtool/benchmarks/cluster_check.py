@@ -0,0 +1,147 @@
+"""
+Cluster mode check
+
+Starts several scheduler daemons as separate processes sharing one SQLite
+job store, loads it with one-time jobs that fall due over a few seconds,
+and verifies from the daemons' run journals that every job ran exactly
+once. With --crash, one daemon dies mid-run while holding leases; its jobs
+must be taken over by the others once the leases expire.
+
+Jobs just sleep for --duration seconds instead of running a real operation.
+
+Usage:
+    python benchmarks/cluster_check.py
+    python benchmarks/cluster_check.py --daemons 4 --jobs 500 --crash
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+
+GODTOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(GODTOOL_DIR)
+
+def cluster_settings(workdir, node, lease_seconds):
+    from utils.scheduler import DEFAULT_SCHEDULER_SETTINGS
+
+    settings = dict(DEFAULT_SCHEDULER_SETTINGS)
+    settings.update({
+        'jobs_db': os.path.join(workdir, 'jobs.db'),
+        'jobs_file': os.path.join(workdir, 'scheduled_jobs.json'),
+        'journal_file': os.path.join(workdir, f'runs-{node}.jsonl'),
+        'control_socket': os.path.join(workdir, f'{node}.sock'),
+        'cluster': True,
+        'node_id': node,
+        'lease_seconds': lease_seconds,
+        'cluster_poll_seconds': 1,
+        'misfire_grace_seconds': 3600
+    })
+    return settings
+
+def seed_jobs(workdir, count, spread):
+    from utils.job_store import SQLiteJobStore
+
+    store = SQLiteJobStore(os.path.join(workdir, 'jobs.db'))
+    start = datetime.now() + timedelta(seconds=2)
+    for index in range(count):
+        next_run = (start + timedelta(seconds=spread * index / count)).isoformat()
+        store.add({
+            'id': None, 'type': 'fetch', 'args': {'url': f"https://example.com/{index}"},
+            'schedule_time': None, 'interval': None, 'daily': False,
+            'created': datetime.now().isoformat(), 'last_run': None,
+            'next_run': next_run, 'slot': next_run, 'status': 'scheduled'
+        })
+    return store
+
+def run_daemon(workdir, node, seconds, duration, lease_seconds, crash_after):
+    """Child process: run a cluster daemon whose jobs only sleep"""
+    from utils.executor import JobExecutor
+    from utils.scheduler import JobScheduler
+
+    class SleepExecutor(JobExecutor):
+        def submit(self, job_id, job_type, fn, *args, **kwargs):
+            return super().submit(job_id, job_type, time.sleep, duration, **kwargs)
+
+    scheduler = JobScheduler(settings=cluster_settings(workdir, node, lease_seconds))
+    scheduler.prepare_daemon(executor=SleepExecutor(max_workers=8))
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        scheduler._wakeup.clear()
+        wait_for = scheduler.run_pending()
+        if crash_after and len(scheduler._leased) >= crash_after:
+            os._exit(1)  # Die holding leases, like a killed daemon
+        if wait_for:
+            scheduler._wakeup.wait(min(wait_for, max(0.0, deadline - time.monotonic())))
+
+    scheduler.executor.shutdown(wait=True)
+    scheduler.journal.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that clustered daemons run each job exactly once")
+    parser.add_argument("--daemons", type=int, default=3, help="Number of daemon processes (default: 3)")
+    parser.add_argument("--jobs", type=int, default=300, help="Number of one-time jobs (default: 300)")
+    parser.add_argument("--spread", type=float, default=5.0, help="Seconds over which the jobs fall due")
+    parser.add_argument("--duration", type=float, default=0.05, help="Seconds each job 'runs'")
+    parser.add_argument("--lease", type=int, default=3, help="Lease length in seconds (default: 3)")
+    parser.add_argument("--crash", action="store_true", help="Kill one daemon while it holds leases")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--seconds", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--crash-after", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_daemon(args.workdir, args.child, args.seconds, args.duration, args.lease, args.crash_after)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='godtool-cluster-')
+    os.makedirs(os.path.join(workdir, 'logs'))
+    os.chdir(workdir)
+    store = seed_jobs(workdir, args.jobs, args.spread)
+
+    # Long enough for every job to fall due, plus a lease expiry for takeovers
+    seconds = 2 + args.spread + args.lease + 4
+    print(f"⏱️  {args.daemons} daemons, {args.jobs} jobs, lease {args.lease}s{' with a crash' if args.crash else ''}...")
+
+    children = []
+    for index in range(args.daemons):
+        command = [sys.executable, os.path.abspath(__file__), '--child', f'node{index}', '--workdir', workdir,
+                   '--seconds', str(seconds), '--duration', str(args.duration), '--lease', str(args.lease)]
+        if args.crash and index == 0:
+            command += ['--crash-after', '1']
+        children.append(subprocess.Popen(command, stdout=subprocess.DEVNULL))
+    for child in children:
+        child.wait()
+
+    from utils.journal import RunJournal
+
+    runs = {}
+    per_node = {}
+    for index in range(args.daemons):
+        node = f'node{index}'
+        journal = RunJournal(os.path.join(workdir, f'runs-{node}.jsonl'))
+        for record in journal.iter_records():
+            if record['outcome'] == 'ok':
+                runs[record['job_id']] = runs.get(record['job_id'], 0) + 1
+                per_node[node] = per_node.get(node, 0) + 1
+
+    duplicates = sorted(job_id for job_id, count in runs.items() if count > 1)
+    missing = args.jobs - len(runs)
+    unfinished = [job['id'] for job in store.iter_jobs() if job['status'] != 'completed']
+
+    for node, count in sorted(per_node.items()):
+        print(f"   {node}: {count} runs")
+    print(f"   Duplicate runs: {len(duplicates)}, missing runs: {missing}, unfinished jobs: {len(unfinished)}")
+
+    if duplicates or missing or unfinished:
+        print(f"❌ Cluster check failed (work dir: {workdir})")
+        sys.exit(1)
+    print("✅ Every job ran exactly once")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+CLI cold start benchmark
+
+Runs cheap main.py commands in fresh interpreters and reports the median
+wall time per command, plus any heavy third-party module (yt_dlp, PyPDF2,
+bs4, pytz, requests) that got imported although the command doesn't need
+it. Commands run in a scratch directory so the real config/ is untouched.
+
+Results are appended to benchmarks/results/import_time.json with the git
+commit. With --max-ms the script exits non-zero when a command is slower,
+so it can guard against import-time regressions.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 20 --max-ms 150
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+GODTOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(GODTOOL_DIR, 'main.py')
+RESULTS_FILE = os.path.join(GODTOOL_DIR, 'benchmarks', 'results', 'import_time.json')
+
+HEAVY_MODULES = ['yt_dlp', 'PyPDF2', 'bs4', 'pytz', 'requests']
+
+# Runs a main.py command in-process, then reports which heavy modules it loaded
+PROBE = """
+import os, sys, runpy, json, contextlib, io
+sys.argv = [sys.argv[1]] + sys.argv[2:]
+sys.path.insert(0, os.path.dirname(sys.argv[0]))
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        runpy.run_path(sys.argv[0], run_name='__main__')
+    except SystemExit:
+        pass
+print(json.dumps([name for name in %r if name in sys.modules]))
+""" % (HEAVY_MODULES,)
+
+def commands(workdir):
+    empty_dir = os.path.join(workdir, 'files')
+    os.makedirs(empty_dir, exist_ok=True)
+    return {
+        'help': ['--help'],
+        'rename': ['rename', empty_dir, 'Bench'],
+        'schedule list': ['schedule', 'list'],
+        'schedule stats': ['schedule', 'stats']
+    }
+
+def median_ms(command, workdir, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def heavy_imports(argv, workdir):
+    probe = subprocess.run([sys.executable, '-c', PROBE, MAIN] + argv, cwd=workdir,
+                           capture_output=True, text=True)
+    try:
+        return json.loads(probe.stdout.strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        return ['<probe failed>']
+
+def git_version():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=GODTOOL_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+def save_results(results):
+    history = []
+    if os.path.exists(RESULTS_FILE):
+        with open(RESULTS_FILE, 'r') as f:
+            history = json.load(f)
+
+    history.append({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'version': git_version(),
+        'python': sys.version.split()[0],
+        'results': results
+    })
+
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump(history, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure main.py cold start per command")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per command (default: 10)")
+    parser.add_argument("--max-ms", type=float, help="Fail if any command's median exceeds this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='godtool-import-')
+    os.makedirs(os.path.join(workdir, 'logs'))
+
+    # Baseline: a bare interpreter, to tell our cost apart from Python's own
+    baseline = median_ms([sys.executable, '-c', 'pass'], workdir, args.runs)
+
+    results = []
+    for name, argv in commands(workdir).items():
+        median = median_ms([sys.executable, MAIN] + argv, workdir, args.runs)
+        results.append({
+            'command': name,
+            'median_ms': round(median, 1),
+            'over_python_ms': round(median - baseline, 1),
+            'heavy_imports': heavy_imports(argv, workdir)
+        })
+
+    print(f"\nPython startup: {baseline:.1f} ms")
+    print(f"{'Command':<16} {'Median ms':>10} {'+Python':>9}  Heavy imports")
+    print("-" * 60)
+    for row in results:
+        print(f"{row['command']:<16} {row['median_ms']:>10} {row['over_python_ms']:>9}  "
+              f"{', '.join(row['heavy_imports']) or '-'}")
+
+    save_results(results)
+    print(f"\n💾 Results appended to {RESULTS_FILE}")
+
+    if args.max_ms is not None:
+        slow = [row['command'] for row in results if row['median_ms'] > args.max_ms]
+        if slow:
+            print(f"❌ Slower than {args.max_ms} ms: {', '.join(slow)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
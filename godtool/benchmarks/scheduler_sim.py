@@ -0,0 +1,210 @@
+"""
+Scheduler simulation benchmark
+
+Loads synthetic one-time, interval and daily jobs into JobScheduler and
+drives it with a virtual clock and no-op job handlers, so hours of
+scheduling run in seconds. Each size runs in its own process so the
+peak memory figures don't bleed into each other.
+
+Measures:
+    - add throughput (jobs/s through add_job into the real job store)
+    - dispatch lag p50/p95/p99 (virtual seconds between slot and start)
+    - daemon CPU seconds per simulated hour
+    - peak memory (max RSS)
+
+Results are appended to benchmarks/results/scheduler_sim.json together
+with the git commit, so runs from different versions can be compared.
+
+Usage:
+    python benchmarks/scheduler_sim.py                      # 10k, 100k and 1M jobs
+    python benchmarks/scheduler_sim.py --sizes 10000 --hours 2
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime, timedelta
+
+# Add the project root to path so we can import utils
+GODTOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(GODTOOL_DIR)
+
+RESULTS_FILE = os.path.join(GODTOOL_DIR, 'benchmarks', 'results', 'scheduler_sim.json')
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+class VirtualClock:
+    """A clock that only moves when the benchmark advances it"""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+class InlineExecutor:
+    """No-op stand-in for JobExecutor: every job 'runs' instantly in virtual time"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.dispatched = 0
+
+    def submit(self, job_id, job_type, fn, *args, on_done=None, exec_class='io', timeout=None):
+        self.dispatched += 1
+        if on_done:
+            on_done('ok', None, self.clock.now().timestamp())
+        return True
+
+    def shutdown(self, wait=True):
+        pass
+
+def synthetic_jobs(count, rng):
+    """Yield add_job keyword arguments: a third each of one-time, interval and daily jobs"""
+    for index in range(count):
+        kind = index % 3
+        schedule_time = f"{rng.randrange(24):02d}:{rng.randrange(60):02d}"
+        args = {'url': f"https://example.com/{index}", 'lines': 5}
+
+        if kind == 0:
+            yield {'job_type': 'fetch', 'args': args, 'schedule_time': schedule_time}
+        elif kind == 1:
+            yield {'job_type': 'fetch', 'args': args, 'interval': rng.choice([5, 15, 30, 60, 240, 1440])}
+        else:
+            yield {'job_type': 'fetch', 'args': args, 'schedule_time': schedule_time, 'daily': True}
+
+def run_size(count, hours, seed):
+    """Benchmark one job count in the current process and return the measurements"""
+    # Work in a scratch directory so the real config/ and logs/ are never touched
+    workdir = tempfile.mkdtemp(prefix='godtool-bench-')
+    os.makedirs(os.path.join(workdir, 'logs'))
+    os.chdir(workdir)
+
+    from utils.scheduler import JobScheduler, DEFAULT_SCHEDULER_SETTINGS
+    from utils.journal import compute_stats
+
+    rng = random.Random(seed)
+
+    settings = dict(DEFAULT_SCHEDULER_SETTINGS)
+    settings.update({
+        'jobs_db': os.path.join(workdir, 'jobs.db'),
+        'jobs_file': os.path.join(workdir, 'scheduled_jobs.json'),
+        'journal_file': os.path.join(workdir, 'job_runs.jsonl'),
+        'journal_max_bytes': 1 << 40,
+        'jitter_seconds': 0
+    })
+
+    clock = VirtualClock(datetime.now().replace(microsecond=0))
+    scheduler = JobScheduler(clock=clock.now, settings=settings)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        add_started = time.perf_counter()
+        for spec in synthetic_jobs(count, rng):
+            scheduler.add_job(**spec)
+        add_seconds = time.perf_counter() - add_started
+
+        executor = InlineExecutor(clock)
+        load_started = time.perf_counter()
+        scheduler.prepare_daemon(executor=executor)
+        load_seconds = time.perf_counter() - load_started
+
+        end = clock.now() + timedelta(hours=hours)
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        while clock.now() < end:
+            wait_for = scheduler.run_pending()
+            if wait_for:
+                clock.advance(min(wait_for, (end - clock.now()).total_seconds()))
+        cpu_seconds = time.process_time() - cpu_started
+        wall_seconds = time.perf_counter() - wall_started
+
+    scheduler.journal.close()
+    stats = compute_stats(scheduler.journal.iter_records()).get('fetch', {})
+
+    return {
+        'jobs': count,
+        'simulated_hours': hours,
+        'add_jobs_per_second': round(count / add_seconds, 1),
+        'load_seconds': round(load_seconds, 3),
+        'dispatched': executor.dispatched,
+        'dispatch_lag_seconds': stats.get('lag', {}),
+        'daemon_cpu_seconds_per_hour': round(cpu_seconds / hours, 3),
+        'wall_seconds': round(wall_seconds, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+def git_version():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=GODTOOL_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+def save_results(results):
+    history = []
+    if os.path.exists(RESULTS_FILE):
+        with open(RESULTS_FILE, 'r') as f:
+            history = json.load(f)
+
+    history.append({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'version': git_version(),
+        'python': sys.version.split()[0],
+        'results': results
+    })
+
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump(history, f, indent=2)
+
+def print_results(results):
+    print(f"\n{'Jobs':>10} {'Add/s':>10} {'Dispatched':>11} {'Lag p50':>8} {'p99':>8} {'CPU s/h':>8} {'Peak MB':>8}")
+    print("-" * 70)
+    for row in results:
+        lag = row['dispatch_lag_seconds']
+        print(f"{row['jobs']:>10} {row['add_jobs_per_second']:>10} {row['dispatched']:>11} "
+              f"{lag.get('p50', 0) or 0:>8.3f} {lag.get('p99', 0) or 0:>8.3f} "
+              f"{row['daemon_cpu_seconds_per_hour']:>8} {row['peak_rss_mb']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the job scheduler with a virtual clock")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES, help="Job counts to simulate")
+    parser.add_argument("--hours", type=float, default=1.0, help="Simulated hours per size (default: 1)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic jobs")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_size(args.child, args.hours, args.seed)))
+        return
+
+    results = []
+    for size in args.sizes:
+        print(f"⏱️  Simulating {size:,} jobs for {args.hours}h...")
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', str(size),
+             '--hours', str(args.hours), '--seed', str(args.seed)],
+            capture_output=True, text=True
+        )
+        if child.returncode != 0:
+            print(f"❌ Run with {size} jobs failed:\n{child.stderr}")
+            continue
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    if results:
+        print_results(results)
+        save_results(results)
+        print(f"\n💾 Results appended to {RESULTS_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import sys
 sys.path.append(".")
-from utils.scheduler import scheduler_instance
-scheduler_instance.clear_all_jobs()
+from utils.scheduler import get_scheduler
+get_scheduler().clear_all_jobs()
 print("All jobs cleared!")
 
@@ -10,7 +10,7 @@ from datetime import datetime, timedelta
 # Add the parent directory to path so we can import utils
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.scheduler import scheduler_instance
+from utils.scheduler import get_scheduler
 
 def test_immediate_execution():
     """Test scheduling a job that should run immediately"""
@@ -29,7 +29,7 @@ def test_immediate_execution():
         'prefix': 'test'
     }
 
-    job_id = scheduler_instance.add_job(
+    job_id = get_scheduler().add_job(
         job_type='rename',
         args=test_args,
         schedule_time=test_time.strftime('%H:%M'),
@@ -48,11 +48,12 @@ def show_current_jobs():
     current_time = datetime.now()
     print(f"🕐 System time: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
-    if not scheduler_instance.jobs:
+    jobs = get_scheduler().load_jobs()
+    if not jobs:
         print("📝 No jobs found")
         return
 
-    for job in scheduler_instance.jobs:
+    for job in jobs.values():
         print(f"\n📌 Job {job['id']} ({job['type']}):")
         print(f"   Status: {job['status']}")
 
@@ -85,7 +86,7 @@ def quick_test():
         'lines': 5
     }
 
-    job_id = scheduler_instance.add_job(
+    job_id = get_scheduler().add_job(
         job_type='fetch',
         args=test_args,
         schedule_time=test_time.strftime('%H:%M'),
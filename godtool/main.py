@@ -1,6 +1,73 @@
 import argparse
+import importlib
 import sys
-from utils import file_ops, youtube_ops, pdf_ops, email_ops, web_ops, scheduler
+
+def run_fetch(web_ops, args):
+    if args.batch:
+        web_ops.batch_fetch(args.batch, args.concurrency, args.per_host)
+    elif args.save is not None:
+        web_ops.save_content(args.url, args.save or None)
+    else:
+        print(web_ops.pretty_fetch(args.url, args.lines))
+
+def run_sortemail(email_ops, args):
+    if args.idle:
+        load_module("mail_rules").sort_on_arrival(args.sender, args.rules, args.full)
+    elif args.sender:
+        email_ops.sort_emails_by_sender(args.sender, args.full)
+    else:
+        load_module("mail_rules").apply_mail_rules(args.rules, args.dry_run, args.full)
+
+def run_archive(archive, args):
+    if args.get is not None:
+        archive.extract_capture(args.get, args.output)
+    else:
+        archive.list_captures(args.url, args.limit)
+
+def run_watch(watch, args):
+    if args.history:
+        watch.show_history(args.url)
+    elif args.show is not None or args.diff is not None:
+        version = args.show if args.diff is None else args.diff
+        watch.show_version(args.url, version or None, diff=args.diff is not None)
+    else:
+        watch.check_page(args.url)
+
+# Command registry: command -> (utils module, handler). The module is imported
+# only when its command runs, so e.g. 'rename' never loads yt_dlp or PyPDF2.
+COMMANDS = {
+    "rename": ("file_ops", lambda ops, args: ops.rename_files(args.path, args.prefix)),
+    "yt": ("youtube_ops", lambda ops, args: ops.download_video(args.url, args.path)),
+    "pdfmerge": ("pdf_ops", lambda ops, args: ops.merge_pdfs(args.path, args.output)),
+    "sortemail": ("email_ops", run_sortemail),
+    "mailstats": ("mail_index", lambda ops, args: ops.show_stats(
+        args.folder, args.top, args.sender, args.recent, args.offline, args.full)),
+    "mailsearch": ("mail_index", lambda ops, args: ops.search_subjects(
+        " ".join(args.words), args.folder, args.limit, args.offline)),
+    "fetch": ("web_ops", run_fetch),
+    "linkcheck": ("linkcheck", lambda ops, args: ops.run_linkcheck(
+        args.source, args.concurrency, args.per_host, args.timeout, args.ttl, args.all)),
+    "watch": ("watch", run_watch),
+    "archive": ("archive", run_archive),
+    "crawl": ("crawler", lambda ops, args: ops.crawl(
+        args.seed, args.output, args.depth, args.max_pages, args.concurrency, args.rate,
+        not args.any_host, False if args.ignore_robots else None)),
+}
+
+SCHEDULE_ACTIONS = {
+    "list": lambda scheduler, args: scheduler.list_jobs(),
+    "remove": lambda scheduler, args: scheduler.remove_job(args.ids[0] if len(args.ids) == 1 else args.ids),
+    "pause": lambda scheduler, args: scheduler.pause_jobs(args.ids),
+    "resume": lambda scheduler, args: scheduler.resume_jobs(args.ids),
+    "clear": lambda scheduler, args: scheduler.clear_all_jobs(),
+    "stats": lambda scheduler, args: scheduler.show_stats(),
+    "start": lambda scheduler, args: scheduler.start_daemon(),
+    "stop": lambda scheduler, args: scheduler.stop_daemon(),
+    "add": lambda scheduler, args: scheduler.schedule_job(args),
+}
+
+def load_module(name):
+    return importlib.import_module(f"utils.{name}")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -12,12 +79,25 @@ Examples:
   python main.py yt "https://youtube.com/watch?v=..." /downloads
   python main.py pdfmerge /pdf/folder --output combined.pdf
   python main.py sortemail sender@example.com
+  python main.py sortemail --rules config/mail_rules.json --dry-run
+  python main.py sortemail --idle
+  python main.py mailstats --top 20
+  python main.py mailsearch invoice 2024 --offline
   python main.py fetch "https://api.github.com" --lines 30
+  python main.py fetch --batch urls.txt --concurrency 16
+  python main.py fetch "https://example.com/big.iso" --save big.iso
+  python main.py fetch "https://example.com/feed.xml" --save
+  python main.py archive "https://example.com/feed.xml"
+  python main.py linkcheck "https://example.com/sitemap.xml"
+  python main.py crawl "https://example.com" --depth 3 --output site.jsonl
+  python main.py watch "https://example.com/pricing" --history
   python main.py schedule --job rename --path /files --prefix "Auto" --time "14:30"
   python main.py schedule --list
   python main.py schedule --remove 1
   python main.py schedule --remove-all 1,2,3
   python main.py schedule --clear
+  python main.py schedule pause 1 2
+  python main.py schedule stop
         """
     )
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
@@ -38,13 +118,74 @@ Examples:
     pdf_parser.add_argument("--output", default="merged.pdf", help="Output PDF filename (default: merged.pdf)")
 
     # Email sorting
-    email_parser = subparsers.add_parser("sortemail", help="Sort unread emails by sender")
-    email_parser.add_argument("sender", help="Email address of sender to sort")
+    email_parser = subparsers.add_parser("sortemail", help="Sort unread emails by sender, or by every rule in a rules file")
+    email_parser.add_argument("sender", nargs='?', help="Email address of sender to sort (omit to apply the rules file)")
+    email_parser.add_argument("--rules", help="Rules file (default: config/mail_rules.json)")
+    email_parser.add_argument("--dry-run", action="store_true", help="Show where rules would move emails without moving them")
+    email_parser.add_argument("--full", action="store_true", help="Check the whole inbox, not just mail since the last sort")
+    email_parser.add_argument("--idle", action="store_true", help="Keep running and sort new mail as it arrives (IMAP IDLE)")
+
+    # Mailbox statistics and search (local header index)
+    mailstats_parser = subparsers.add_parser("mailstats", help="Email counts and top senders from the local header index")
+    mailstats_parser.add_argument("--folder", help="Folder to report on (default: the inbox)")
+    mailstats_parser.add_argument("--top", type=int, default=10, help="Show the top N senders (default: 10)")
+    mailstats_parser.add_argument("--sender", help="Counts for this sender address instead of the top senders")
+    mailstats_parser.add_argument("--recent", type=int, metavar="N", help="Top senders of the last N emails only")
+    mailstats_parser.add_argument("--offline", action="store_true", help="Don't sync with the server first")
+    mailstats_parser.add_argument("--full", action="store_true", help="Re-read the flags of every email while syncing")
+
+    search_parser = subparsers.add_parser("mailsearch", help="Search email subjects in the local header index")
+    search_parser.add_argument("words", nargs='+', help="Words the subject must contain ('word*' for a prefix)")
+    search_parser.add_argument("--folder", help="Folder to search (default: the inbox)")
+    search_parser.add_argument("--limit", type=int, default=50, help="Show at most N emails (default: 50)")
+    search_parser.add_argument("--offline", action="store_true", help="Don't sync with the server first")
 
     # Web fetching
     web_parser = subparsers.add_parser("fetch", help="Fetch webpage content")
-    web_parser.add_argument("url", help="URL to fetch")
+    web_parser.add_argument("url", nargs='?', help="URL to fetch")
     web_parser.add_argument("--lines", type=int, default=20, help="Show first N lines (default: 20)")
+    web_parser.add_argument("--save", nargs='?', const='', metavar="FILE",
+                            help="Download to FILE instead of printing (streamed, resumable)")
+    web_parser.add_argument("--batch", metavar="FILE", help="Fetch every URL in FILE (one per line, '-' for stdin)")
+    web_parser.add_argument("--concurrency", type=int, default=8, help="Parallel requests in batch mode (default: 8)")
+    web_parser.add_argument("--per-host", type=int, default=2, help="Parallel requests per host in batch mode (default: 2)")
+
+    # Web archive
+    archive_parser = subparsers.add_parser("archive", help="List or extract pages saved to the web archive")
+    archive_parser.add_argument("url", nargs='?', help="Only list captures of this URL")
+    archive_parser.add_argument("--limit", type=int, default=50, help="Show the newest N captures (default: 50)")
+    archive_parser.add_argument("--get", type=int, metavar="ID", help="Print the body of capture ID")
+    archive_parser.add_argument("--output", help="With --get, write the body to this file instead")
+
+    # Link checking
+    link_parser = subparsers.add_parser("linkcheck", help="Check every link on a page or in a sitemap")
+    link_parser.add_argument("source", help="URL of an HTML page or an XML sitemap")
+    link_parser.add_argument("--concurrency", type=int, help="Parallel checks (default from settings: 16)")
+    link_parser.add_argument("--per-host", type=int, help="Parallel checks per host (default from settings: 4)")
+    link_parser.add_argument("--timeout", type=int, help="Seconds per check (default from settings: 10)")
+    link_parser.add_argument("--ttl", type=float, help="Reuse results younger than this many hours (0 rechecks all)")
+    link_parser.add_argument("--all", action="store_true", help="Also list working links")
+
+    # Change monitoring
+    watch_parser = subparsers.add_parser("watch", help="Check a page for changes and keep its version history")
+    watch_parser.add_argument("url", nargs='?', help="Page to check")
+    watch_parser.add_argument("--history", action="store_true",
+                              help="List stored versions of the page (all watched pages without a URL)")
+    watch_parser.add_argument("--show", nargs='?', const=0, type=int, metavar="VERSION",
+                              help="Print a stored version (default: newest)")
+    watch_parser.add_argument("--diff", nargs='?', const=0, type=int, metavar="VERSION",
+                              help="Show what changed in a version (default: newest)")
+
+    # Crawling
+    crawl_parser = subparsers.add_parser("crawl", help="Breadth-first crawl of a site, saving pages as JSON lines")
+    crawl_parser.add_argument("seed", help="URL to start from")
+    crawl_parser.add_argument("--depth", type=int, help="Follow links up to N hops from the seed (default from settings: 2)")
+    crawl_parser.add_argument("--max-pages", type=int, help="Stop after N pages (default from settings: 1000)")
+    crawl_parser.add_argument("--concurrency", type=int, help="Parallel requests (default from settings: 8)")
+    crawl_parser.add_argument("--rate", type=float, help="Requests per second per host (default from settings: 2, 0 = no limit)")
+    crawl_parser.add_argument("--output", help="JSON lines file to write (default from settings: crawl.jsonl)")
+    crawl_parser.add_argument("--any-host", action="store_true", help="Follow links to other hosts too")
+    crawl_parser.add_argument("--ignore-robots", action="store_true", help="Don't read robots.txt")
 
     # Scheduler - CLEAN VERSION
     schedule_parser = subparsers.add_parser("schedule", help="Schedule tasks to run automatically")
@@ -59,20 +200,33 @@ Examples:
     remove_parser = schedule_subparsers.add_parser("remove", help="Remove jobs")
     remove_parser.add_argument("ids", nargs='+', type=int, help="Job ID(s) to remove")
 
+    # Pause / resume jobs
+    pause_parser = schedule_subparsers.add_parser("pause", help="Pause jobs without removing them")
+    pause_parser.add_argument("ids", nargs='+', type=int, help="Job ID(s) to pause")
+    resume_parser = schedule_subparsers.add_parser("resume", help="Resume paused jobs")
+    resume_parser.add_argument("ids", nargs='+', type=int, help="Job ID(s) to resume")
+
     # Clear all jobs
     clear_parser = schedule_subparsers.add_parser("clear", help="Remove all jobs")
 
+    # Run statistics
+    stats_parser = schedule_subparsers.add_parser("stats", help="Show dispatch lag and duration per job type")
+
     # Start/stop daemon
     start_parser = schedule_subparsers.add_parser("start", help="Start scheduler daemon")
     stop_parser = schedule_subparsers.add_parser("stop", help="Stop scheduler daemon")
 
     # Add job
     add_parser = schedule_subparsers.add_parser("add", help="Add a new scheduled job")
-    add_parser.add_argument("--job", choices=["rename", "yt", "pdfmerge", "sortemail", "fetch"],
+    add_parser.add_argument("--job", choices=["rename", "yt", "pdfmerge", "sortemail", "fetch", "watch"],
                            required=True, help="Type of job to schedule")
     add_parser.add_argument("--time", help="Time to run (HH:MM format)")
     add_parser.add_argument("--interval", type=int, help="Run every N minutes")
     add_parser.add_argument("--daily", action="store_true", help="Run daily at specified time")
+    add_parser.add_argument("--misfire", choices=["coalesce", "skip", "all"],
+                           help="What to do with runs missed while the daemon was down (default from settings)")
+    add_parser.add_argument("--jitter", type=int, help="Spread the start over up to N seconds after the scheduled time")
+    add_parser.add_argument("--timeout", type=int, help="Give up on a run after N seconds (default per job type)")
 
     # Job-specific arguments
     add_parser.add_argument("--path", help="Path for file operations")
@@ -80,7 +234,9 @@ Examples:
     add_parser.add_argument("--url", help="URL for YouTube or web operations")
     add_parser.add_argument("--output", help="Output filename")
     add_parser.add_argument("--sender", help="Email sender to sort")
+    add_parser.add_argument("--rules", help="Rules file for sortemail jobs without --sender")
     add_parser.add_argument("--lines", type=int, default=20, help="Lines to show for web fetch")
+    add_parser.add_argument("--archive", action="store_true", help="Save each web fetch to the web archive")
 
     args = parser.parse_args()
 
@@ -88,41 +244,21 @@ Examples:
         parser.print_help()
         return
 
+    if args.command == "fetch" and not (args.url or args.batch):
+        web_parser.error("give a URL or --batch FILE")
+    if args.command == "watch" and not (args.url or args.history):
+        watch_parser.error("give a URL to check")
+
     try:
-        if args.command == "rename":
-            file_ops.rename_files(args.path, args.prefix)
-
-        elif args.command == "yt":
-            youtube_ops.download_video(args.url, args.path)
-
-        elif args.command == "pdfmerge":
-            pdf_ops.merge_pdfs(args.path, args.output)
-
-        elif args.command == "sortemail":
-            email_ops.sort_emails_by_sender(args.sender)
-
-        elif args.command == "fetch":
-            result = web_ops.pretty_fetch(args.url, args.lines)
-            print(result)
-
-        elif args.command == "schedule":
-            if args.schedule_action == "list":
-                scheduler.list_jobs()
-            elif args.schedule_action == "remove":
-                if len(args.ids) == 1:
-                    scheduler.remove_job(args.ids[0])
-                else:
-                    scheduler.remove_job(args.ids)  # Will handle multiple
-            elif args.schedule_action == "clear":
-                scheduler.clear_all_jobs()
-            elif args.schedule_action == "start":
-                scheduler.start_daemon()
-            elif args.schedule_action == "stop":
-                scheduler.stop_daemon()
-            elif args.schedule_action == "add":
-                scheduler.schedule_job(args)
+        if args.command == "schedule":
+            action = SCHEDULE_ACTIONS.get(args.schedule_action)
+            if action:
+                action(load_module("scheduler"), args)
             else:
                 schedule_parser.print_help()
+        else:
+            module_name, handler = COMMANDS[args.command]
+            handler(load_module(module_name), args)
 
     except KeyboardInterrupt:
         print("\n\nOperation cancelled by user.")
@@ -35,19 +35,19 @@ def create_config_files():
             "imap_server": "imap.gmail.com",
             "imap_port": 993,
             "inbox_folder": "INBOX",
-            "sorted_folder": "Sorted"
+            "sorted_folder": "Sorted",
+            "scheduler": {
+                "job_store": "sqlite",
+                "max_workers": 4,
+                "type_limits": {"yt": 2}
+            }
         }
 
         with open(config_file, 'w') as f:
             json.dump(default_config, f, indent=2)
         print(f"✅ Created config file: {config_file}")
 
-    # Create empty scheduled_jobs.json
-    jobs_file = Path('config/scheduled_jobs.json')
-    if not jobs_file.exists():
-        with open(jobs_file, 'w') as f:
-            json.dump([], f)
-        print(f"✅ Created jobs file: {jobs_file}")
+    # Scheduled jobs live in config/jobs.db, created by the scheduler on first use
 
 def create_init_files():
     """Create __init__.py files for proper module imports"""
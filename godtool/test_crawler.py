@@ -0,0 +1,77 @@
+import os
+import json
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.crawler import Crawler
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """A two-page site whose robots.txt disallows /private/"""
+
+    PAGES = {
+        '/robots.txt': ('text/plain', b'User-agent: *\nDisallow: /private/\n'),
+        '/': ('text/html', b'<html><body><a href="/public">public</a> <a href="/private/page">private</a></body></html>'),
+        '/public': ('text/html', b'<html><body>public</body></html>'),
+        '/private/page': ('text/html', b'<html><body>private</body></html>'),
+    }
+    requested = []
+    robots_status = 200
+
+    def do_GET(self):
+        self.requested.append(self.path)
+        content_type, body = self.PAGES.get(self.path, ('text/plain', b''))
+        status = 200 if self.path in self.PAGES else 404
+        if self.path == '/robots.txt':
+            status = self.robots_status
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class RobotsTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        SiteHandler.requested = []
+        SiteHandler.robots_status = 200
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.seed = f'http://127.0.0.1:{self.server.server_port}/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.workdir)
+
+    def crawl(self):
+        output = os.path.join(self.workdir, 'crawl.jsonl')
+        crawler = Crawler(self.seed, output, max_depth=1, concurrency=2, rate=0, timeout=5)
+        return asyncio.run(crawler.run()), output
+
+    def test_disallowed_url_is_skipped(self):
+        stats, output = self.crawl()
+
+        self.assertEqual(stats['robots_blocked'], 1)
+        self.assertEqual(stats['fetched'], 2)
+        self.assertNotIn('/private/page', SiteHandler.requested)
+        with open(output, encoding='utf-8') as f:
+            crawled = {json.loads(line)['url'] for line in f}
+        self.assertEqual(crawled, {self.seed, self.seed + 'public'})
+
+    def test_forbidden_robots_txt_disallows_the_host(self):
+        SiteHandler.robots_status = 403
+        stats, _ = self.crawl()
+
+        self.assertEqual(stats['robots_blocked'], 1)
+        self.assertEqual(stats['fetched'], 0)
+        self.assertEqual(SiteHandler.requested, ['/robots.txt'])
+
+if __name__ == '__main__':
+    unittest.main()
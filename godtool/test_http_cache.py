@@ -0,0 +1,69 @@
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils import http_client
+from utils.http_cache import HttpCache
+from utils.web_ops import fetch_page
+
+class RevalidatingHandler(BaseHTTPRequestHandler):
+    """Serves one page that must always be revalidated, answering 304 while its ETag matches"""
+
+    ETAG = '"v1"'
+    BODY = b'<html><body>cached page</body></html>'
+    sent = []  # Status codes answered, in order
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.ETAG:
+            self.sent.append(304)
+            self.send_response(304)
+            self.send_header('ETag', self.ETAG)
+            self.send_header('Cache-Control', 'max-age=0')
+            self.end_headers()
+        else:
+            self.sent.append(200)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(self.BODY)))
+            self.send_header('ETag', self.ETAG)
+            self.send_header('Cache-Control', 'max-age=0')
+            self.end_headers()
+            self.wfile.write(self.BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+class RevalidationTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.saved_cache = http_client._cache
+        http_client._cache = HttpCache(self.cache_dir)
+        RevalidatingHandler.sent = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RevalidatingHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/page'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        http_client._cache = self.saved_cache
+        shutil.rmtree(self.cache_dir)
+
+    def test_304_serves_cached_body(self):
+        first = fetch_page(self.url)
+        self.assertTrue(first['success'])
+        self.assertFalse(first['from_cache'])
+
+        # The entry is stale at once (max-age=0), so this asks the server again
+        second = fetch_page(self.url)
+        self.assertTrue(second['success'])
+        self.assertTrue(second['from_cache'])
+        self.assertEqual(second['status_code'], 200)
+        self.assertEqual(second['content'], first['content'])
+        self.assertEqual(RevalidatingHandler.sent, [200, 304])
+        self.assertEqual(http_client._cache.lookup(self.url)['etag'], RevalidatingHandler.ETAG)
+
+if __name__ == '__main__':
+    unittest.main()
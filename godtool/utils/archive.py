@@ -0,0 +1,226 @@
+import os
+import zlib
+import uuid
+import base64
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_ARCHIVE_SETTINGS = {
+    'directory': 'archive',
+    'segment_max_bytes': 256 * 1024 * 1024,
+    'save_unnamed': True,  # save_content() without a filename appends here instead of writing a .txt
+    'compression_level': 6
+}
+
+def load_archive_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('archive', DEFAULT_ARCHIVE_SETTINGS, settings_file)
+
+# Hop-by-hop and encoding headers that no longer describe the stored (decoded) body
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection', 'keep-alive'}
+
+class WebArchive:
+    """
+    Append-only WARC-style archive of HTTP responses.
+
+    Captures are WARC/1.1 'response' records, each compressed as its own
+    gzip member and appended to segment-NNNNN.warc.gz files; a segment is
+    closed once it reaches segment_max_bytes. A SQLite index maps every
+    capture to (segment, offset, length), so reading one is a single seek
+    and read however big the archive gets. The segments stay readable by
+    standard WARC tools.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS captures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            captured_at TEXT NOT NULL,
+            status INTEGER,
+            content_type TEXT,
+            size INTEGER NOT NULL,
+            digest TEXT NOT NULL,
+            segment INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_captures_url ON captures (url, id);
+    """
+
+    def __init__(self, directory='archive', segment_max_bytes=256 * 1024 * 1024, compression_level=6):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.compression_level = compression_level
+        self._local = threading.local()
+        os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.db'), timeout=60, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, f"segment-{segment:05d}.warc.gz")
+
+    def _current_segment(self, conn, incoming):
+        """Segment to append to: the newest one, unless incoming bytes would overflow it"""
+        segment = conn.execute('SELECT MAX(segment) FROM captures').fetchone()[0] or 1
+        path = self.segment_path(segment)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size and size + incoming > self.segment_max_bytes:
+            segment += 1
+        return segment
+
+    def add(self, url, status, reason, headers, body_chunks, body_size, digest=None):
+        """
+        Append one response.
+
+        Args:
+            headers: response headers as (name, value) pairs
+            body_chunks: iterable of the decoded body in bytes chunks
+            body_size: total length of those chunks
+            digest: sha1 of the body, if the caller already computed it
+
+        Returns:
+            int: capture id
+        """
+        http_head = [f"HTTP/1.1 {status} {reason or ''}".rstrip()]
+        content_type = ''
+        for name, value in headers:
+            if name.lower() == 'content-type':
+                content_type = value
+            if name.lower() not in DROPPED_HEADERS:
+                http_head.append(f"{name}: {value}")
+        http_head.append(f"Content-Length: {body_size}")
+        http_head = ('\r\n'.join(http_head) + '\r\n\r\n').encode('latin-1', errors='replace')
+
+        captured_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        payload_digest = f"sha1:{base64.b32encode(bytes.fromhex(digest)).decode()}" if digest else None
+        warc_head = [
+            'WARC/1.1',
+            'WARC-Type: response',
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {captured_at}",
+            f"WARC-Target-URI: {url}",
+            'Content-Type: application/http; msgtype=response',
+            f"Content-Length: {len(http_head) + body_size}"
+        ]
+        if payload_digest:
+            warc_head.insert(5, f"WARC-Payload-Digest: {payload_digest}")
+        warc_head = ('\r\n'.join(warc_head) + '\r\n\r\n').encode('utf-8')
+
+        conn = self._conn()
+        # The write lock on the index also serializes appends from other processes
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            segment = self._current_segment(conn, len(warc_head) + len(http_head) + body_size)
+            compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, 31)  # 31 = gzip framing
+            with open(self.segment_path(segment), 'ab') as f:
+                offset = f.tell()
+                f.write(compressor.compress(warc_head))
+                f.write(compressor.compress(http_head))
+                for chunk in body_chunks:
+                    f.write(compressor.compress(chunk))
+                f.write(compressor.compress(b'\r\n\r\n'))
+                f.write(compressor.flush())
+                length = f.tell() - offset
+
+            cursor = conn.execute(
+                'INSERT INTO captures (url, captured_at, status, content_type, size, digest, segment, offset, length) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, captured_at, status, content_type, body_size, digest or '', segment, offset, length)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            # Bytes already appended stay as an unindexed member that readers never reach
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.lastrowid
+
+    def add_bytes(self, url, status, reason, headers, body):
+        return self.add(url, status, reason, headers, [body], len(body), hashlib.sha1(body).hexdigest())
+
+    def get(self, capture_id):
+        """
+        One capture, read with a single seek.
+
+        Returns:
+            dict: index fields plus 'headers' (list of pairs) and 'body' bytes, or None
+        """
+        row = self._conn().execute('SELECT * FROM captures WHERE id = ?', (capture_id,)).fetchone()
+        if row is None:
+            return None
+
+        with open(self.segment_path(row['segment']), 'rb') as f:
+            f.seek(row['offset'])
+            record = zlib.decompress(f.read(row['length']), 31)
+
+        _, _, http_block = record.partition(b'\r\n\r\n')
+        http_head, _, body = http_block.partition(b'\r\n\r\n')
+        headers = []
+        for line in http_head.decode('latin-1').split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            headers.append((name.strip(), value.strip()))
+
+        capture = dict(row)
+        capture['headers'] = headers
+        capture['body'] = body[:row['size']]
+        return capture
+
+    def captures(self, url=None, limit=50):
+        """Index entries, newest first, optionally for one URL"""
+        if url:
+            rows = self._conn().execute('SELECT * FROM captures WHERE url = ? ORDER BY id DESC LIMIT ?', (url, limit))
+        else:
+            rows = self._conn().execute('SELECT * FROM captures ORDER BY id DESC LIMIT ?', (limit,))
+        return [dict(row) for row in rows]
+
+    def latest(self, url):
+        row = self._conn().execute('SELECT id FROM captures WHERE url = ? ORDER BY id DESC LIMIT 1', (url,)).fetchone()
+        return self.get(row['id']) if row else None
+
+    def stats(self):
+        count, size = self._conn().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM captures').fetchone()
+        segments = [name for name in os.listdir(self.directory) if name.endswith('.warc.gz')]
+        stored = sum(os.path.getsize(os.path.join(self.directory, name)) for name in segments)
+        return {'captures': count, 'body_bytes': size, 'segments': len(segments), 'stored_bytes': stored}
+
+def open_archive(settings=None):
+    settings = settings or load_archive_settings()
+    return WebArchive(settings['directory'], settings['segment_max_bytes'], settings['compression_level'])
+
+def list_captures(url=None, limit=50):
+    """CLI: print the newest captures (of one URL, if given)"""
+    archive = open_archive()
+    captures = archive.captures(url, limit)
+    if not captures:
+        print("📭 No captures in the archive")
+        return
+    print(f"{'ID':<7} {'Captured (UTC)':<21} {'Status':<7} {'Size':<10} URL")
+    print("-" * 80)
+    for c in captures:
+        print(f"{c['id']:<7} {c['captured_at']:<21} {c['status'] or '-':<7} {c['size']:<10} {c['url']}")
+    stats = archive.stats()
+    print(f"\n📦 {stats['captures']} captures in {stats['segments']} segments, "
+          f"{stats['stored_bytes'] / 1024 / 1024:.1f} MB on disk for {stats['body_bytes'] / 1024 / 1024:.1f} MB of content")
+
+def extract_capture(capture_id, output=None):
+    """CLI: write one capture's body to a file, or print it"""
+    capture = open_archive().get(capture_id)
+    if capture is None:
+        print(f"❌ No capture with id {capture_id}")
+        return False
+    if output:
+        with open(output, 'wb') as f:
+            f.write(capture['body'])
+        print(f"💾 Capture {capture_id} ({capture['url']}) written to {output}")
+    else:
+        print(capture['body'].decode('utf-8', errors='replace'))
+    return True
@@ -0,0 +1,142 @@
+import os
+import json
+import socket
+import socketserver
+import threading
+import logging
+
+DEFAULT_SOCKET_PATH = 'config/scheduler.sock'
+
+# Unix-domain sockets are not available everywhere (e.g. older Windows builds)
+CONTROL_SUPPORTED = hasattr(socketserver, 'ThreadingUnixStreamServer')
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """One JSON request line in, one JSON response line out"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+            result = self.server.control.handle_command(request.get('cmd'), request.get('params') or {})
+            response = {'ok': True, 'result': result}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+
+        self.wfile.write(json.dumps(response, default=str).encode() + b'\n')
+
+class ControlServer:
+    """
+    Local control API for a running scheduler daemon.
+
+    Listens on a Unix-domain socket so CLI commands can add, remove, list,
+    pause and resume jobs on the live scheduler instead of editing the
+    job store behind its back.
+    """
+
+    def __init__(self, scheduler, path=DEFAULT_SOCKET_PATH):
+        self.scheduler = scheduler
+        self.path = path
+        self._server = None
+        self._thread = None
+
+    def handle_command(self, cmd, params):
+        scheduler = self.scheduler
+
+        if cmd == 'ping':
+            return {'pid': os.getpid()}
+        if cmd == 'list':
+            return scheduler.snapshot_jobs()
+        if cmd == 'add':
+            job_id = scheduler.add_job(
+                job_type=params['job_type'],
+                args=params['args'],
+                schedule_time=params.get('schedule_time'),
+                interval=params.get('interval'),
+                daily=params.get('daily', False),
+                misfire_policy=params.get('misfire_policy'),
+                jitter=params.get('jitter'),
+                timeout=params.get('timeout')
+            )
+            return scheduler.get_job(job_id)
+        if cmd == 'remove':
+            return {str(job_id): scheduler.remove_job(job_id) for job_id in params['ids']}
+        if cmd == 'clear':
+            return scheduler.clear_all_jobs()
+        if cmd == 'pause':
+            return {str(job_id): scheduler.pause_job(job_id) for job_id in params['ids']}
+        if cmd == 'resume':
+            return {str(job_id): scheduler.resume_job(job_id) for job_id in params['ids']}
+        if cmd == 'stop':
+            scheduler.stop()
+            return True
+
+        raise ValueError(f"Unknown control command: {cmd}")
+
+    def start(self):
+        """Bind the socket and serve requests on a background thread"""
+        if not CONTROL_SUPPORTED:
+            logging.warning("Control socket not supported on this platform")
+            return False
+
+        if os.path.exists(self.path):
+            if send_command('ping', path=self.path) is not None:
+                raise RuntimeError(f"Another scheduler daemon is already listening on {self.path}")
+            os.unlink(self.path)  # Left behind by a daemon that crashed
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, _ControlHandler)
+        self._server.daemon_threads = True
+        self._server.control = self
+        os.chmod(self.path, 0o600)
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='godtool-control', daemon=True)
+        self._thread.start()
+        logging.info(f"Control socket listening on {self.path}")
+        return True
+
+    def stop(self):
+        if not self._server:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+def send_command(cmd, params=None, path=DEFAULT_SOCKET_PATH, timeout=5):
+    """
+    Send a command to a running daemon.
+
+    Returns:
+        The command result, or None if no daemon is listening.
+    Raises:
+        RuntimeError: if the daemon received the command but it failed
+    """
+    if not CONTROL_SUPPORTED or not os.path.exists(path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(json.dumps({'cmd': cmd, 'params': params or {}}).encode() + b'\n')
+
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if chunk.endswith(b'\n'):
+                    break
+    except (ConnectionRefusedError, FileNotFoundError):
+        return None
+
+    response = json.loads(b''.join(chunks))
+    if not response.get('ok'):
+        raise RuntimeError(response.get('error', 'Unknown daemon error'))
+    return response['result']
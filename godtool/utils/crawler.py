@@ -0,0 +1,260 @@
+import json
+import math
+import time
+import asyncio
+import hashlib
+import logging
+import urllib.parse
+import urllib.robotparser
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from utils.web_ops import fetch_page
+from utils.linkcheck import extract_links, normalize_url
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_CRAWL_SETTINGS = {
+    'output': 'crawl.jsonl',
+    'max_depth': 2,
+    'max_pages': 1000,
+    'concurrency': 8,
+    'rate': 2.0,             # Requests per second per host
+    'frontier_size': 10000,  # URLs waiting to be fetched; further links are dropped
+    'timeout': 10,
+    'obey_robots': True
+}
+
+def load_crawl_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('crawl', DEFAULT_CRAWL_SETTINGS, settings_file)
+
+class BloomFilter:
+    """
+    Fixed-size set membership test with a small false-positive rate.
+
+    Takes about 1.2 bytes per URL at 1% error instead of the URL string, so
+    a million-URL crawl needs ~1.2 MB to remember what it has seen. A false
+    positive means a URL is wrongly treated as seen and skipped.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item):
+        """Add item; returns True if it was (probably) not there before"""
+        added = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        return added
+
+class Crawler:
+    """
+    Polite breadth-first crawler.
+
+    Worker tasks on an asyncio loop take (url, depth) pairs from a bounded
+    frontier queue and fetch them with fetch_page on a thread pool (so the
+    pooled keep-alive session is reused). Each host is fetched at most
+    `rate` times per second and robots.txt is obeyed. Every page is written
+    to the output file as one JSON line as soon as it arrives.
+    """
+
+    def __init__(self, seed, output, max_depth=2, max_pages=1000, concurrency=8, rate=2.0,
+                 frontier_size=10000, same_host=True, obey_robots=True, timeout=10):
+        self.seed = normalize_url(seed if '://' in seed else f"https://{seed}")
+        if not self.seed:
+            raise ValueError(f"Not an http(s) URL: {seed}")
+        self.output = output
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.delay = 1.0 / rate if rate else 0
+        self.frontier_size = frontier_size
+        self.same_host = same_host
+        self.obey_robots = obey_robots
+        self.timeout = timeout
+
+        self.seed_host = urllib.parse.urlsplit(self.seed).netloc
+        self.seen = BloomFilter(capacity=max(100_000, max_pages * 50))
+        self.stats = {'fetched': 0, 'failed': 0, 'robots_blocked': 0, 'frontier_full': 0, 'queued': 0}
+        self._next_slot = {}  # host -> loop time of its next allowed request
+        self._robots = {}     # host -> future of its RobotFileParser
+
+    def _in_scope(self, url):
+        return not self.same_host or urllib.parse.urlsplit(url).netloc == self.seed_host
+
+    def _enqueue(self, frontier, url, depth):
+        if self.stats['queued'] >= self.max_pages or not self._in_scope(url):
+            return
+        if url in self.seen:
+            return
+        try:
+            frontier.put_nowait((url, depth))
+        except asyncio.QueueFull:
+            # Not marked seen, so a later page linking to it can still queue it
+            self.stats['frontier_full'] += 1
+            return
+        self.seen.add(url)
+        self.stats['queued'] += 1
+
+    async def _wait_for_host(self, host):
+        """Reserve the host's next request slot and sleep until it comes"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.delay
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _robots_for(self, scheme, host):
+        """
+        Fetch and parse a host's robots.txt. A 401 or 403 disallows the whole
+        host, as the robots.txt convention says; any other failure (404, 5xx,
+        no connection) allows everything.
+        """
+        parser = urllib.robotparser.RobotFileParser()
+        try:
+            await self._wait_for_host(host)
+            result = await asyncio.to_thread(fetch_page, f"{scheme}://{host}/robots.txt", self.timeout, False)
+        except Exception as e:
+            logging.warning(f"Could not read robots.txt of {host}: {e}")
+            result = {'success': False, 'status_code': None}
+
+        if result['success']:
+            parser.parse(result['content'].splitlines())
+        elif result['status_code'] in (401, 403):
+            parser.disallow_all = True
+        else:
+            parser.allow_all = True
+        return parser
+
+    async def _allowed(self, url):
+        if not self.obey_robots:
+            return True
+        parts = urllib.parse.urlsplit(url)
+        robots = self._robots.get(parts.netloc)
+        if robots is None:
+            # The first URL for a host fetches robots.txt; the others await the same future
+            robots = self._robots[parts.netloc] = asyncio.get_running_loop().create_future()
+            parser = urllib.robotparser.RobotFileParser()
+            parser.allow_all = True
+            try:
+                parser = await self._robots_for(parts.scheme, parts.netloc)
+            finally:
+                # Resolved even if this worker is cancelled mid-fetch, so the others never hang
+                robots.set_result(parser)
+        # Shielded, so a worker cancelled while waiting doesn't cancel the shared future
+        parser = await asyncio.shield(robots)
+        return parser.can_fetch('*', url)
+
+    async def _worker(self, frontier, out):
+        while True:
+            url, depth = await frontier.get()
+            try:
+                await self._crawl_one(frontier, out, url, depth)
+            except Exception as e:
+                logging.error(f"Crawling {url} failed: {e}")
+                self.stats['failed'] += 1
+            finally:
+                frontier.task_done()
+
+    async def _crawl_one(self, frontier, out, url, depth):
+        if not await self._allowed(url):
+            self.stats['robots_blocked'] += 1
+            return
+
+        await self._wait_for_host(urllib.parse.urlsplit(url).netloc)
+        started = time.perf_counter()
+        result = await asyncio.to_thread(fetch_page, url, self.timeout, False)
+        elapsed = round(time.perf_counter() - started, 3)
+
+        links = []
+        if result['success'] and 'html' in (result['content_type'] or ''):
+            for link in extract_links(result['content'], result['url'] or url):
+                normalized = normalize_url(link)
+                if normalized:
+                    links.append(normalized)
+
+        record = {
+            'url': url,
+            'final_url': result.get('url'),
+            'depth': depth,
+            'status': result['status_code'],
+            'content_type': result['content_type'],
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            'elapsed': elapsed,
+            'links': len(links),
+            'error': result['error'],
+            'content': result['content']
+        }
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        if result['success']:
+            self.stats['fetched'] += 1
+            print(f"✅ [{depth}] {url} ({len(links)} links)")
+        else:
+            self.stats['failed'] += 1
+            print(f"❌ [{depth}] {url}: {result['error']}")
+
+        if depth < self.max_depth:
+            for link in links:
+                self._enqueue(frontier, link, depth + 1)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        # fetch_page blocks, so the workers hand it to a pool of the same size
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency,
+                                                     thread_name_prefix='godtool-crawl'))
+
+        frontier = asyncio.Queue(maxsize=self.frontier_size)
+        self._enqueue(frontier, self.seed, 0)
+
+        with open(self.output, 'w', encoding='utf-8') as out:
+            workers = [asyncio.create_task(self._worker(frontier, out)) for _ in range(self.concurrency)]
+            try:
+                await frontier.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        return self.stats
+
+def crawl(seed, output=None, max_depth=None, max_pages=None, concurrency=None, rate=None,
+          same_host=True, obey_robots=None):
+    """CLI entry point: crawl from seed and report what was fetched"""
+    settings = load_crawl_settings()
+    output = output or settings['output']
+    crawler = Crawler(
+        seed, output,
+        max_depth=settings['max_depth'] if max_depth is None else max_depth,
+        max_pages=max_pages or settings['max_pages'],
+        concurrency=concurrency or settings['concurrency'],
+        rate=settings['rate'] if rate is None else rate,
+        frontier_size=settings['frontier_size'],
+        same_host=same_host,
+        obey_robots=settings['obey_robots'] if obey_robots is None else obey_robots,
+        timeout=settings['timeout']
+    )
+    print(f"🕷️  Crawling {crawler.seed} (depth {crawler.max_depth}, up to {crawler.max_pages} pages)")
+    started = time.perf_counter()
+    stats = asyncio.run(crawler.run())
+
+    print(f"\n✨ {stats['fetched']} pages fetched, {stats['failed']} failed in {time.perf_counter() - started:.1f}s")
+    if stats['robots_blocked']:
+        print(f"🤖 {stats['robots_blocked']} URLs skipped by robots.txt")
+    if stats['frontier_full']:
+        print(f"⚠️  {stats['frontier_full']} links dropped because the frontier was full")
+    print(f"💾 Pages written to {output}")
+    return stats
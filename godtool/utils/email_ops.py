@@ -1,8 +1,14 @@
-import imaplib
+import re
 import email
+import email.policy
+import imaplib
 import json
 import os
 from datetime import datetime
+from utils.imap_pool import get_pool, open_connection
+from utils.mail_sync import new_uids
+
+PREVIEW_LIMIT = 20  # Subjects printed per sort; the rest are only counted
 
 def load_config():
     """Load email configuration from settings.json"""
@@ -20,32 +26,7 @@ def load_config():
 def connect_mailbox():
     """Connect to email server and return mail connection and config"""
     cfg = load_config()
-
-    # Validate required fields
-    required_fields = ['email', 'password', 'imap_server', 'imap_port']
-    for field in required_fields:
-        if field not in cfg or not cfg[field]:
-            raise ValueError(f"Missing required configuration: {field}")
-
-    try:
-        print(f"🔌 Connecting to {cfg['imap_server']}...")
-        mail = imaplib.IMAP4_SSL(cfg['imap_server'], cfg['imap_port'])
-        mail.login(cfg['email'], cfg['password'])
-
-        # Select inbox folder
-        inbox = cfg.get('inbox_folder', 'INBOX')
-        result = mail.select(inbox)
-
-        if result[0] != 'OK':
-            raise Exception(f"Failed to select folder: {inbox}")
-
-        print(f"✅ Connected successfully to {cfg['email']}")
-        return mail, cfg
-
-    except imaplib.IMAP4.error as e:
-        raise Exception(f"IMAP connection error: {e}")
-    except Exception as e:
-        raise Exception(f"Email connection failed: {e}")
+    return open_connection(cfg), cfg
 
 def create_folder_if_not_exists(mail, folder_name):
     """Create email folder if it doesn't exist"""
@@ -69,93 +50,172 @@ def create_folder_if_not_exists(mail, folder_name):
         print(f"⚠️  Error managing folder {folder_name}: {e}")
         return False
 
-def sort_emails_by_sender(target_sender):
-    """Sort unread emails from a specific sender into a designated folder"""
-    try:
-        mail, cfg = connect_mailbox()
-
-        # Get sorted folder name
-        sorted_folder = cfg.get('sorted_folder', 'Sorted')
-
-        # Create sorted folder if it doesn't exist
-        create_folder_if_not_exists(mail, sorted_folder)
-
-        print(f"🔍 Searching for unread emails from: {target_sender}")
-
-        # Search for unread emails from target sender
-        search_criteria = f'(UNSEEN FROM "{target_sender}")'
-        status, data = mail.search(None, search_criteria)
+def compress_uid_set(uids, max_length=8000):
+    """
+    IMAP sequence sets for uids with consecutive runs collapsed ("1:5,8,10:12").
+
+    Returns a list of sets, each short enough for one command line.
+    """
+    ranges = []
+    for uid in sorted(set(int(u) for u in uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+
+    sets, current = [], ''
+    for start, end in ranges:
+        part = str(start) if start == end else f"{start}:{end}"
+        if current and len(current) + len(part) + 1 > max_length:
+            sets.append(current)
+            current = ''
+        current = f"{current},{part}" if current else part
+    if current:
+        sets.append(current)
+    return sets
+
+HEADER_FIELDS = 'BODY.PEEK[HEADER.FIELDS (SUBJECT FROM DATE)]'
+UID_IN_FETCH = re.compile(rb'UID (\d+)')
+FLAGS_IN_FETCH = re.compile(rb'FLAGS \(([^)]*)\)')
+
+def fetch_headers(mail, uids, batch_size=1000, fields=HEADER_FIELDS):
+    """
+    Subject/From/Date and flags of each uid, fetched batch_size messages
+    per command.
+
+    PEEK leaves the messages unread and only the header lines are sent.
+
+    Returns:
+        dict: uid -> {'subject', 'from', 'date', 'flags'}
+    """
+    headers = {}
+    uids = sorted(uids)
+    for start in range(0, len(uids), batch_size):
+        for uid_set in compress_uid_set(uids[start:start + batch_size]):
+            status, data = mail.uid('FETCH', uid_set, f"(UID FLAGS {fields})")
+            if status != 'OK':
+                raise Exception(f"Failed to fetch headers for {uid_set}")
+            for item in data:
+                if not isinstance(item, tuple):
+                    continue  # The closing ')' of each response
+                match = UID_IN_FETCH.search(item[0])
+                if not match:
+                    continue
+                msg = email.message_from_bytes(item[1], policy=email.policy.default)
+                flags = FLAGS_IN_FETCH.search(item[0])
+                headers[int(match.group(1))] = {
+                    'subject': str(msg.get('Subject', 'No Subject')),
+                    'from': str(msg.get('From', 'Unknown Sender')),
+                    'date': str(msg.get('Date', 'Unknown Date')),
+                    'flags': flags.group(1).decode().split() if flags else []
+                }
+    return headers
+
+def move_messages(mail, uids, folder):
+    """
+    Move messages to folder with one command per UID set.
+
+    Uses UID MOVE where the server advertises it, otherwise UID COPY plus one
+    STORE of \\Deleted over the same set and an expunge.
+
+    Returns:
+        int: number of messages moved
+    """
+    uid_sets = compress_uid_set(uids)
+    if not uid_sets:
+        return 0
+
+    remaining = list(uid_sets)
+    if 'MOVE' in mail.capabilities:
+        try:
+            while remaining:
+                if mail.uid('MOVE', remaining[0], folder)[0] != 'OK':
+                    raise Exception(f"Failed to move messages to {folder}")
+                remaining.pop(0)
+            return len(uids)
+        except imaplib.IMAP4.abort:
+            raise
+        except imaplib.IMAP4.error:
+            pass  # MOVE advertised but refused; copy the sets not moved yet
+
+    for uid_set in remaining:
+        if mail.uid('COPY', uid_set, folder)[0] != 'OK':
+            raise Exception(f"Failed to copy messages to {folder}")
+        mail.uid('STORE', uid_set, '+FLAGS.SILENT', '(\\Deleted)')
+
+    if 'UIDPLUS' in mail.capabilities:
+        # Only expunge what we copied, not other messages marked deleted
+        for uid_set in remaining:
+            mail.uid('EXPUNGE', uid_set)
+    else:
+        mail.expunge()
+    return len(uids)
 
-        if status != 'OK':
-            raise Exception("Failed to search emails")
+def sort_sender_messages(mail, cfg, target_sender, full=False):
+    """
+    Move unread emails from target_sender that arrived since the last sort
+    of that sender (all of them with full=True) on an open connection.
 
-        email_ids = data[0].split() if data[0] else []
+    Returns:
+        tuple: (sorted_count, failed_count)
+    """
+    batch_size = cfg.get('settings', {}).get('header_batch_size', 1000)
+    inbox = cfg.get('inbox_folder', 'INBOX')
 
-        if not email_ids:
-            print(f"📭 No unread emails found from {target_sender}")
-            mail.logout()
-            return
+    # Get sorted folder name
+    sorted_folder = cfg.get('sorted_folder', 'Sorted')
 
-        print(f"📬 Found {len(email_ids)} unread emails from {target_sender}")
+    print(f"🔍 Searching for unread emails from: {target_sender}")
 
-        sorted_count = 0
-        failed_count = 0
+    # Only messages newer than this sender's checkpoint are searched
+    sender = target_sender.replace('\\', '\\\\').replace('"', '\\"')
+    uids, commit = new_uids(mail, inbox, f"sender:{target_sender.lower()}", cfg['email'],
+                            f'UNSEEN FROM "{sender}"', full)
 
-        for eid in email_ids:
-            try:
-                # Fetch email details
-                status, msg_data = mail.fetch(eid, '(RFC822)')
+    if not uids:
+        print(f"📭 No new unread emails found from {target_sender}")
+        commit()
+        return 0, 0
 
-                if status != 'OK' or not msg_data:
-                    print(f"⚠️  Could not fetch email ID {eid.decode()}")
-                    failed_count += 1
-                    continue
+    print(f"📬 Found {len(uids)} unread emails from {target_sender}")
 
-                # Safety check for message data
-                if not isinstance(msg_data[0], tuple) or len(msg_data[0]) < 2:
-                    print(f"⚠️  Invalid email data for ID {eid.decode()}")
-                    failed_count += 1
-                    continue
+    # Create sorted folder if it doesn't exist
+    create_folder_if_not_exists(mail, sorted_folder)
 
-                raw_email = msg_data[0][1]
-                if not isinstance(raw_email, (bytes, bytearray)):
-                    print(f"⚠️  Invalid email format for ID {eid.decode()}")
-                    failed_count += 1
-                    continue
+    # The move needs only uids; headers are fetched just for the preview
+    preview = uids[:PREVIEW_LIMIT]
+    headers = fetch_headers(mail, preview, batch_size)
+    for uid in preview:
+        subject = headers.get(uid, {}).get('subject', 'No Subject')
+        print(f"📧 Processing: {subject[:50]}{'...' if len(subject) > 50 else ''}")
+    if len(uids) > PREVIEW_LIMIT:
+        print(f"   ... and {len(uids) - PREVIEW_LIMIT} more")
 
-                # Parse email
-                msg = email.message_from_bytes(raw_email)
-                subject = msg.get('Subject', 'No Subject')
-                sender = msg.get('From', 'Unknown Sender')
-                date = msg.get('Date', 'Unknown Date')
-
-                print(f"📧 Processing: {subject[:50]}{'...' if len(subject) > 50 else ''}")
-
-                # Copy email to sorted folder
-                copy_result = mail.copy(eid, sorted_folder)
-                if copy_result[0] == 'OK':
-                    # Mark original as deleted
-                    mail.store(eid, '+FLAGS', '\\Deleted')
-                    sorted_count += 1
-                    print(f"✅ Moved email: {subject[:30]}...")
-                else:
-                    print(f"❌ Failed to move email: {subject[:30]}...")
-                    failed_count += 1
+    try:
+        sorted_count = move_messages(mail, uids, sorted_folder)
+    except Exception as e:
+        # Checkpoint stays put, so the next run tries these again
+        print(f"❌ Failed to move emails: {e}")
+        return 0, len(uids)
 
-            except Exception as e:
-                print(f"❌ Error processing email ID {eid.decode()}: {e}")
-                failed_count += 1
-                continue
+    commit()
+    return sorted_count, 0
 
-        # Expunge deleted emails
-        mail.expunge()
-        mail.logout()
+def sort_emails_by_sender(target_sender, full=False):
+    """Sort unread emails from a specific sender into a designated folder"""
+    try:
+        pool = get_pool(load_config)
+        cfg = pool.config
+        with pool.connection() as mail:
+            sorted_count, failed_count = sort_sender_messages(mail, cfg, target_sender, full)
+        if not (sorted_count or failed_count):
+            return
 
         # Summary
         print(f"\n📊 Email Sorting Summary:")
         print(f"   ✅ Successfully sorted: {sorted_count}")
         print(f"   ❌ Failed: {failed_count}")
-        print(f"   📁 Moved to folder: {sorted_folder}")
+        print(f"   📁 Moved to folder: {cfg.get('sorted_folder', 'Sorted')}")
 
         if sorted_count > 0:
             print(f"🎉 Successfully sorted {sorted_count} emails from {target_sender}")
@@ -164,63 +224,20 @@ def sort_emails_by_sender(target_sender):
         print(f"❌ Email sorting failed: {e}")
         raise
 
-def get_email_stats():
-    """Get basic email statistics"""
+def get_email_stats(offline=False):
+    """Get basic email statistics from the local header index"""
+    from utils import mail_index
     try:
-        mail, cfg = connect_mailbox()
-
-        # Count total emails
-        status, total = mail.search(None, 'ALL')
-        total_count = len(total[0].split()) if total[0] else 0
-
-        # Count unread emails
-        status, unread = mail.search(None, 'UNSEEN')
-        unread_count = len(unread[0].split()) if unread[0] else 0
-
-        mail.logout()
-
-        print(f"📊 Email Statistics:")
-        print(f"   📧 Total emails: {total_count}")
-        print(f"   📬 Unread emails: {unread_count}")
-        print(f"   📖 Read emails: {total_count - unread_count}")
-
-        return {
-            'total': total_count,
-            'unread': unread_count,
-            'read': total_count - unread_count
-        }
-
+        return mail_index.show_stats(top=0, offline=offline)
     except Exception as e:
         print(f"❌ Error getting email stats: {e}")
         return None
 
-def list_recent_senders(limit=10):
-    """List recent email senders"""
+def list_recent_senders(limit=10, recent=100, offline=False):
+    """List the most frequent senders among the recent emails"""
+    from utils import mail_index
     try:
-        mail, cfg = connect_mailbox()
-
-        # Search for recent emails (last 100)
-        status, data = mail.search(None, 'ALL')
-        email_ids = data[0].split()[-100:] if data[0] else []
-
-        senders = {}
-
-        for eid in email_ids[-limit:]:  # Get last N emails
-            try:
-                status, msg_data = mail.fetch(eid, '(ENVELOPE)')
-                if status == 'OK' and msg_data:
-                    # Parse envelope data (simplified)
-                    envelope_str = msg_data[0][1].decode('utf-8', errors='ignore')
-                    # This is a simplified approach - in production, you'd want proper envelope parsing
-
-            except Exception:
-                continue
-
-        mail.logout()
-
-        print(f"👥 Recent Email Senders (showing last {len(senders)}):")
-        for sender, count in sorted(senders.items(), key=lambda x: x[1], reverse=True):
-            print(f"   📧 {sender}: {count} emails")
-
+        return mail_index.show_top_senders(limit=limit, recent=recent, offline=offline)
     except Exception as e:
         print(f"❌ Error listing senders: {e}")
+        return None
@@ -0,0 +1,339 @@
+import time
+import heapq
+import itertools
+import threading
+import logging
+import queue
+from collections import deque
+
+def run_operation(job_type, args):
+    """
+    Run one GodTool operation. Module-level (and importing lazily) so it can
+    be pickled into a worker process.
+    """
+    if job_type == 'rename':
+        from utils import file_ops
+        file_ops.rename_files(args['path'], args['prefix'])
+    elif job_type == 'yt':
+        from utils import youtube_ops
+        youtube_ops.download_video(args['url'], args.get('path', '.'))
+    elif job_type == 'pdfmerge':
+        from utils import pdf_ops
+        pdf_ops.merge_pdfs(args['path'], args.get('output', 'merged.pdf'))
+    elif job_type == 'sortemail':
+        if args.get('sender'):
+            from utils import email_ops
+            email_ops.sort_emails_by_sender(args['sender'])
+        else:
+            from utils import mail_rules
+            mail_rules.apply_mail_rules(args.get('rules'))
+    elif job_type == 'fetch':
+        from utils import web_ops
+        if args.get('archive'):
+            web_ops.archive_content(args['url'])
+        else:
+            print(web_ops.pretty_fetch(args['url'], args.get('lines', 20)))
+    elif job_type == 'watch':
+        from utils import watch
+        watch.check_page(args['url'])
+    else:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+class JobExecutor:
+    """
+    Bounded worker pool for scheduled jobs.
+
+    - A fixed number of worker threads, however many jobs fall due at once
+    - Optional per-type caps, e.g. {'yt': 2} allows at most two downloads at a time
+    - Single-flight: a job id that is already queued or running is never submitted twice
+    - 'cpu' jobs run in a worker process so they can't starve the daemon of the GIL
+    - A watchdog enforces per-run wall-clock timeouts, counted from submission
+
+    A run is 'parked' (over its type cap), 'queued' (waiting for a worker),
+    'running', 'finishing' (returned, on_done not done yet), or
+    'abandoned': timed out while its thread was still busy.
+    A thread can't be killed, so an abandoned run keeps its worker, its
+    type slot and its job id until the thread really returns.
+    """
+
+    def __init__(self, max_workers=4, type_limits=None, cpu_workers=2, clock=time.time):
+        self.clock = clock  # Used for the 'started' time reported to on_done
+        self.max_workers = max_workers
+        self.type_limits = dict(type_limits or {})
+        self.cpu_workers = cpu_workers
+        self._cpu_pool = None
+        self._cpu_slots = threading.BoundedSemaphore(cpu_workers)
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._running_by_type = {}
+        self._waiting_by_type = {}
+
+        # Daemon threads: a hung job must not keep the process alive at exit
+        self._queue = queue.SimpleQueue()
+        self._workers = [threading.Thread(target=self._work, name=f'godtool-job_{n}', daemon=True)
+                         for n in range(max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+        # Watchdog state: run token -> run, plus a heap of (deadline, token)
+        self._run_ids = itertools.count(1)
+        self._runs = {}
+        self._deadlines = []
+        self._watchdog_wakeup = threading.Condition(self._lock)
+        self._run_ended = threading.Condition(self._lock)
+        self._closed = False
+        self._stopped = False
+        self._watchdog = threading.Thread(target=self._watch_deadlines, name='godtool-watchdog', daemon=True)
+        self._watchdog.start()
+
+    def submit(self, job_id, job_type, fn, *args, on_done=None, exec_class='io', timeout=None):
+        """
+        Run fn(*args) on the pool; with exec_class='cpu' it runs in a worker process.
+
+        on_done(outcome, error, started) is called exactly once per run.
+        outcome is 'ok', 'failed', 'timeout', or 'cancelled' for a run that
+        shutdown() dropped before it started. After 'ok' or 'failed' the job
+        has already left the in-flight set (so on_done may resubmit it). After
+        a timeout it stays in flight until its thread returns, if it had
+        started.
+
+        Returns:
+            bool: False if the job is already in flight, True if it was accepted
+        """
+        with self._lock:
+            if job_id in self._in_flight:
+                return False
+            self._in_flight.add(job_id)
+
+            run = {'token': next(self._run_ids), 'job_id': job_id, 'job_type': job_type, 'fn': fn, 'args': args,
+                   'on_done': on_done, 'exec_class': exec_class, 'timeout': timeout, 'state': 'parked',
+                   'submitted': self.clock(), 'started': None, 'pool': None}
+            self._runs[run['token']] = run
+            if timeout:
+                # Counted from now, so a job stuck behind hung workers times out as well
+                heapq.heappush(self._deadlines, (time.time() + timeout, run['token']))
+                self._watchdog_wakeup.notify()
+
+            limit = self.type_limits.get(job_type)
+            running = self._running_by_type.get(job_type, 0)
+            if limit is not None and running >= limit:
+                # Park it; a finishing job of the same type hands its slot over
+                self._waiting_by_type.setdefault(job_type, deque()).append(run)
+                return True
+            self._running_by_type[job_type] = running + 1
+            run['state'] = 'queued'
+
+        self._queue.put(run)
+        return True
+
+    def is_in_flight(self, job_id):
+        with self._lock:
+            return job_id in self._in_flight
+
+    def stats(self):
+        """Snapshot of running, waiting and abandoned counts per job type"""
+        with self._lock:
+            abandoned = {}
+            for run in self._runs.values():
+                if run['state'] == 'abandoned':
+                    abandoned[run['job_type']] = abandoned.get(run['job_type'], 0) + 1
+            return {
+                'in_flight': len(self._in_flight),
+                'running': dict(self._running_by_type),
+                'waiting': {job_type: len(waiting) for job_type, waiting in self._waiting_by_type.items() if waiting},
+                'abandoned': abandoned
+            }
+
+    def _get_cpu_pool(self):
+        with self._lock:
+            if self._cpu_pool is None:
+                # Imported here: multiprocessing is only needed once a cpu job runs
+                from concurrent.futures import ProcessPoolExecutor
+                self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+            return self._cpu_pool
+
+    def _work(self):
+        while True:
+            run = self._queue.get()
+            if run is None:
+                return
+            self._run(run)
+
+    def _run(self, run):
+        with self._lock:
+            if run['state'] != 'queued':
+                return  # Timed out (or shut down) while waiting for a worker
+            run['state'] = 'running'
+            run['started'] = self.clock()
+
+        outcome, error = 'ok', None
+        try:
+            if run['exec_class'] == 'cpu':
+                self._run_cpu(run)
+            else:
+                run['fn'](*run['args'])
+        except Exception as e:
+            outcome, error = 'failed', e
+
+        with self._lock:
+            abandoned = run['state'] == 'abandoned'
+            run['state'] = 'finishing'  # The watchdog leaves it alone from here
+        self._release(run)
+        if not abandoned:
+            self._report(run, outcome, error)
+
+        # Only now, so shutdown() waits until on_done has saved the result
+        with self._lock:
+            run['state'] = 'done'
+            self._runs.pop(run['token'], None)
+            self._run_ended.notify_all()
+
+    def _run_cpu(self, run):
+        """Run a cpu job in a worker process, at most cpu_workers at a time"""
+        with self._cpu_slots:
+            if not run['timeout']:
+                return self._get_cpu_pool().submit(run['fn'], *run['args']).result()
+
+            # A job that may have to be killed gets a process of its own, so
+            # killing it can't take down other jobs sharing the pool
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=1)
+            try:
+                with self._lock:
+                    if run['state'] != 'running':
+                        return  # Timed out while waiting for a cpu slot
+                    run['pool'] = pool
+                return pool.submit(run['fn'], *run['args']).result()
+            finally:
+                pool.shutdown(wait=False)
+
+    def _report(self, run, outcome, error):
+        if run['on_done']:
+            try:
+                run['on_done'](outcome, error, run['started'] or run['submitted'])
+            except Exception as e:
+                logging.error(f"Completion callback for job {run['job_id']} failed: {e}")
+
+    def _watch_deadlines(self):
+        with self._lock:
+            while not self._stopped:
+                # Drop deadlines of runs that already finished
+                while self._deadlines and self._deadlines[0][1] not in self._runs:
+                    heapq.heappop(self._deadlines)
+
+                if not self._deadlines:
+                    self._watchdog_wakeup.wait()
+                    continue
+
+                deadline, token = self._deadlines[0]
+                remaining = deadline - time.time()
+                if remaining > 0:
+                    self._watchdog_wakeup.wait(remaining)
+                    continue
+
+                heapq.heappop(self._deadlines)
+                run = self._runs[token]
+                self._lock.release()
+                try:
+                    self._expire(run)
+                finally:
+                    self._lock.acquire()
+
+    def _expire(self, run):
+        """
+        Time out a run. One that hadn't started is dropped; a running one is
+        abandoned, and its worker process (if any) killed.
+        """
+        with self._lock:
+            state = run['state']
+            if state == 'parked':
+                self._waiting_by_type[run['job_type']].remove(run)
+                self._in_flight.discard(run['job_id'])
+            if state in ('parked', 'queued'):
+                run['state'] = 'done'
+                self._runs.pop(run['token'], None)
+            elif state == 'running':
+                run['state'] = 'abandoned'
+            else:
+                return
+            self._run_ended.notify_all()
+
+        logging.warning(f"Job {run['job_id']} exceeded its {run['timeout']}s timeout"
+                        f"{'' if state == 'running' else ' before it started'}")
+        if state == 'queued':
+            self._release(run)  # Its type slot was taken; its worker wasn't
+        elif run['pool'] is not None:
+            self._kill_process(run['pool'])
+        self._report(run, 'timeout', TimeoutError(f"Timed out after {run['timeout']}s"))
+
+    def _kill_process(self, pool):
+        """Terminate the worker process of a one-job process pool"""
+        # ProcessPoolExecutor has no public way to kill a running task
+        for process in list(getattr(pool, '_processes', {}).values()):
+            process.terminate()
+
+    def _release(self, run):
+        """Free a run's job id and type slot, handing the slot to a parked job of the same type"""
+        job_type = run['job_type']
+        with self._lock:
+            self._in_flight.discard(run['job_id'])
+            waiting = self._waiting_by_type.get(job_type)
+            if waiting and not self._closed:
+                # Slot passes straight to the next parked job, so the count stays the same
+                next_run = waiting.popleft()
+                next_run['state'] = 'queued'
+            else:
+                next_run = None
+                self._running_by_type[job_type] -= 1
+
+        if next_run:
+            self._queue.put(next_run)
+
+    def shutdown(self, wait=True, timeout=None):
+        """
+        Stop accepting work and drop jobs that have not started yet; their
+        on_done gets outcome 'cancelled'.
+
+        With wait=True, wait (up to timeout seconds) for running jobs and
+        their on_done calls, but not for abandoned ones, whose threads may
+        never return. The watchdog keeps running meanwhile, so a job that
+        hangs now is abandoned too.
+
+        Returns:
+            int: runs still going on (abandoned or past the timeout)
+        """
+        dropped = []
+        with self._lock:
+            self._closed = True
+            for run in list(self._runs.values()):
+                if run['state'] in ('parked', 'queued'):
+                    if run['state'] == 'queued':
+                        self._running_by_type[run['job_type']] -= 1
+                    run['state'] = 'done'
+                    self._in_flight.discard(run['job_id'])
+                    self._runs.pop(run['token'])
+                    dropped.append(run)
+            for waiting in self._waiting_by_type.values():
+                waiting.clear()
+            cpu_pool = self._cpu_pool
+
+        for _ in self._workers:
+            self._queue.put(None)
+        for run in dropped:
+            self._report(run, 'cancelled', None)
+
+        with self._lock:
+            if wait:
+                end = None if timeout is None else time.monotonic() + timeout
+                while any(run['state'] in ('running', 'finishing') for run in self._runs.values()):
+                    remaining = None if end is None else end - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._run_ended.wait(remaining)
+            still_running = len(self._runs)
+            self._stopped = True
+            self._watchdog_wakeup.notify()
+
+        if cpu_pool:
+            cpu_pool.shutdown(wait=wait and not still_running, cancel_futures=True)
+        return still_running
@@ -0,0 +1,238 @@
+import json
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 64 * 1024
+
+def iter_text_lines(text):
+    """Lines of a string, produced lazily (unlike splitlines())"""
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start)
+        if end < 0:
+            end = len(text)
+        yield text[start:end].rstrip('\r')
+        start = end + 1
+
+class _Enough(Exception):
+    """Raised inside the parser once enough output has been produced"""
+
+def iter_chunks(text, size=CHUNK_SIZE):
+    """Slice a string into chunks without copying it all at once"""
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+class TextExtractor(HTMLParser):
+    """
+    Streaming visible-text extractor.
+
+    Produces the same lines as BeautifulSoup's get_text(separator="\\n")
+    after dropping script/style and blank or single-character lines, but
+    works on chunks and stops as soon as max_lines lines exist.
+    """
+
+    SKIP_TAGS = {'script', 'style'}
+
+    def __init__(self, max_lines=None):
+        super().__init__(convert_charrefs=True)
+        self.max_lines = max_lines
+        self.lines = []
+        self.title = None
+        self._text = []      # Pieces of the current text node
+        self._skip_depth = 0
+        self._in_title = False
+
+    def _flush(self):
+        """End of a text node: split it into cleaned lines"""
+        if not self._text:
+            return
+        text = ''.join(self._text)
+        self._text = []
+
+        if self._in_title and self.title is None:
+            self.title = text.strip()
+        for line in text.split('\n'):
+            line = line.strip()
+            if line and len(line) > 1:  # Skip empty lines and single chars
+                self.lines.append(line)
+                if self.max_lines is not None and len(self.lines) >= self.max_lines:
+                    raise _Enough()
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'title':
+            self._in_title = True
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'title':
+            self._in_title = False
+
+    def handle_data(self, data):
+        # Text may arrive in pieces when it spans a chunk boundary
+        if not self._skip_depth:
+            self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+def extract_text(chunks, max_lines=None):
+    """
+    Visible text lines of an HTML document given as an iterable of chunks.
+
+    Returns:
+        tuple: (title or None, list of lines), at most max_lines lines
+    """
+    parser = TextExtractor(max_lines)
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+        parser._flush()
+    except _Enough:
+        pass
+    return parser.title, parser.lines[:max_lines]
+
+class _JsonScanner:
+    """Pulls JSON tokens out of a stream of text chunks"""
+
+    WHITESPACE = ' \t\n\r'
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = ''
+        self._pos = 0
+
+    def _fill(self):
+        """Load the next chunk; False at end of input"""
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character without consuming it ('' at end)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in self.WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def next_token(self):
+        """Structural character, or a string/number/literal rendered as json.dumps would"""
+        char = self.peek()
+        if not char:
+            raise ValueError("Unexpected end of JSON")
+        if char in '{}[]:,':
+            self._pos += 1
+            return char
+        if char == '"':
+            return json.dumps(json.loads(self._read_string()), ensure_ascii=False)
+        return json.dumps(json.loads(self._read_scalar()))
+
+    def _read_string(self):
+        end = self._pos + 1
+        while True:
+            end = self._buffer.find('"', end)
+            if end < 0:
+                end = len(self._buffer)
+                if not self._fill_keeping():
+                    raise ValueError("Unterminated JSON string")
+                continue
+            # A quote preceded by an odd number of backslashes is escaped
+            backslashes = 0
+            while self._buffer[end - 1 - backslashes] == '\\':
+                backslashes += 1
+            if backslashes % 2 == 0:
+                token = self._buffer[self._pos:end + 1]
+                self._pos = end + 1
+                return token
+            end += 1
+
+    def _read_scalar(self):
+        end = self._pos
+        while True:
+            while end < len(self._buffer) and self._buffer[end] not in self.WHITESPACE + '{}[]:,':
+                end += 1
+            if end < len(self._buffer) or not self._fill_keeping():
+                token = self._buffer[self._pos:end]
+                self._pos = end
+                return token
+
+    def _fill_keeping(self):
+        """Append the next chunk without dropping the token being read"""
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._buffer += chunk
+        return True
+
+def iter_json_lines(chunks, indent=2):
+    """
+    Pretty-print JSON incrementally, one output line at a time.
+
+    Output matches json.dumps(data, indent=indent, ensure_ascii=False), but
+    only as much input is read as the lines taken need, so stopping after
+    N lines costs O(N) however large the document. Only the part that is
+    read gets validated; malformed input raises ValueError when reached.
+    """
+    scanner = _JsonScanner(chunks)
+    pad = ' ' * indent
+    depth = 0
+    line = ''
+    expect_value = True  # A value may start here (vs. ',' / closer)
+
+    while True:
+        char = scanner.peek()
+        if not char:
+            break
+        token = scanner.next_token()
+
+        if token in '{[':
+            closer = '}' if token == '{' else ']'
+            if scanner.peek() == closer:
+                scanner.next_token()
+                line += token + closer
+                expect_value = False
+            else:
+                yield line + token
+                depth += 1
+                line = pad * depth
+                expect_value = True
+        elif token in '}]':
+            if depth == 0:
+                raise ValueError(f"Unexpected '{token}' in JSON")
+            yield line
+            depth -= 1
+            line = pad * depth + token
+            expect_value = False
+        elif token == ',':
+            if expect_value:
+                raise ValueError("Unexpected ',' in JSON")
+            yield line + ','
+            line = pad * depth
+            expect_value = True
+        elif token == ':':
+            line += ': '
+            expect_value = True
+        else:
+            if not expect_value:
+                raise ValueError(f"Unexpected value {token[:20]} in JSON")
+            line += token
+            expect_value = False
+
+        if depth == 0 and not expect_value:
+            break
+
+    if depth or expect_value:
+        raise ValueError("Incomplete JSON document")
+    if scanner.peek():
+        raise ValueError("Extra data after JSON document")
+    yield line
@@ -0,0 +1,199 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from email.utils import parsedate_to_datetime
+
+class HttpCache:
+    """
+    On-disk HTTP response cache keyed by URL.
+
+    Bodies are stored as files under the cache directory; a SQLite index
+    keeps the validators (ETag, Last-Modified), the freshness lifetime from
+    Cache-Control max-age / Expires, and the last access time used for LRU
+    eviction once the bodies pass max_bytes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            url TEXT PRIMARY KEY,
+            body_file TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            status INTEGER NOT NULL,
+            content_type TEXT,
+            encoding TEXT,
+            final_url TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            expires REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+    """
+
+    def __init__(self, directory='cache/http', max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._evict_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.db'), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _body_path(self, body_file):
+        return os.path.join(self.directory, body_file)
+
+    def lookup(self, url):
+        """
+        Cached entry for url as a dict (with 'fresh' and 'body' bytes), or None.
+        """
+        row = self._conn().execute('SELECT * FROM entries WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+
+        try:
+            with open(self._body_path(row['body_file']), 'rb') as f:
+                body = f.read()
+        except OSError:
+            # Body file went missing; forget the entry
+            self._conn().execute('DELETE FROM entries WHERE url = ?', (url,))
+            return None
+
+        now = time.time()
+        self._conn().execute('UPDATE entries SET last_access = ? WHERE url = ?', (now, url))
+        entry = dict(row)
+        entry['body'] = body
+        entry['fresh'] = entry['expires'] > now
+        return entry
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers to revalidate an entry"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response):
+        """
+        Cache a 200 response if it is cacheable.
+
+        Returns:
+            bool: True if the response was stored
+        """
+        expires = freshness_deadline(response.headers)
+        if expires is None or response.status_code != 200:
+            return False
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not (etag or last_modified) and expires <= time.time():
+            return False  # Nothing to revalidate with and already stale
+
+        body = response.content
+        body_file = hashlib.sha256(url.encode('utf-8')).hexdigest() + '.body'
+        tmp_path = self._body_path(f"{body_file}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, self._body_path(body_file))
+
+        self._conn().execute(
+            """INSERT OR REPLACE INTO entries
+               (url, body_file, size, status, content_type, encoding, final_url, etag, last_modified, expires, last_access)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (url, body_file, len(body), response.status_code, response.headers.get('content-type', ''),
+             response.encoding, response.url, etag, last_modified, expires, time.time())
+        )
+        self.evict()
+        return True
+
+    def refresh(self, url, headers):
+        """Apply a 304 Not Modified: new validators and freshness, same body"""
+        expires = freshness_deadline(headers)
+        updates = {'expires': expires if expires is not None else time.time()}
+        if headers.get('ETag'):
+            updates['etag'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            updates['last_modified'] = headers['Last-Modified']
+
+        columns = ', '.join(f"{column} = ?" for column in updates)
+        self._conn().execute(f'UPDATE entries SET {columns} WHERE url = ?', tuple(updates.values()) + (url,))
+
+    def total_size(self):
+        return self._conn().execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used entries until the bodies fit in max_bytes"""
+        with self._evict_lock:
+            total = self.total_size()
+            if total <= self.max_bytes:
+                return 0
+
+            # Evict down to 90% so we don't evict again on the very next store
+            target = self.max_bytes * 0.9
+            removed = 0
+            conn = self._conn()
+            for row in conn.execute('SELECT url, body_file, size FROM entries ORDER BY last_access').fetchall():
+                if total <= target:
+                    break
+                conn.execute('DELETE FROM entries WHERE url = ?', (row['url'],))
+                try:
+                    os.remove(self._body_path(row['body_file']))
+                except FileNotFoundError:
+                    pass
+                total -= row['size']
+                removed += 1
+
+            logging.info(f"HTTP cache evicted {removed} entries")
+            return removed
+
+    def clear(self):
+        conn = self._conn()
+        for (body_file,) in conn.execute('SELECT body_file FROM entries').fetchall():
+            try:
+                os.remove(self._body_path(body_file))
+            except FileNotFoundError:
+                pass
+        conn.execute('DELETE FROM entries')
+
+def freshness_deadline(headers):
+    """
+    Epoch time until which a response may be served without revalidation,
+    now for 'must revalidate', or None if it must not be cached at all.
+    """
+    cache_control = {}
+    for directive in headers.get('Cache-Control', '').lower().split(','):
+        name, _, value = directive.strip().partition('=')
+        if name:
+            cache_control[name] = value.strip('"')
+
+    # A private cache may keep 'private' responses, so only these opt out
+    if 'no-store' in cache_control or headers.get('Vary', '').strip() == '*':
+        return None
+
+    now = time.time()
+    if 'no-cache' in cache_control:
+        return now
+    if 'max-age' in cache_control:
+        try:
+            return now + max(0, int(cache_control['max-age']) - int(headers.get('Age', 0) or 0))
+        except ValueError:
+            return now
+    if headers.get('Expires'):
+        try:
+            return parsedate_to_datetime(headers['Expires']).timestamp()
+        except (TypeError, ValueError):
+            return now
+    return now
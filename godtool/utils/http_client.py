@@ -0,0 +1,89 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_HTTP_SETTINGS = {
+    'pool_connections': 10,  # Number of hosts to keep a connection pool for
+    'pool_maxsize': 10,      # Keep-alive connections per host
+    'pool_block': False,     # Wait for a free connection instead of opening an extra one
+    'retries': 3,
+    'backoff_factor': 0.5,   # Sleep 0.5s, 1s, 2s, ... between retries
+    'retry_statuses': [429, 500, 502, 503, 504],
+    'cache': True,
+    'cache_dir': 'cache/http',
+    'cache_max_bytes': 100 * 1024 * 1024
+}
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+
+def load_http_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('http', DEFAULT_HTTP_SETTINGS, settings_file)
+
+def create_session(settings=None):
+    """
+    Build a requests.Session with keep-alive connection pools and retries.
+
+    Retries cover connection errors and the retry_statuses, for idempotent
+    methods only, with exponential backoff (honouring Retry-After).
+    """
+    settings = {**DEFAULT_HTTP_SETTINGS, **(settings or {})}
+
+    retry = Retry(
+        total=settings['retries'],
+        backoff_factor=settings['backoff_factor'],
+        status_forcelist=settings['retry_statuses'],
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        respect_retry_after_header=True,
+        raise_on_status=False  # Hand back the last response; callers check the status
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings['pool_connections'],
+        pool_maxsize=settings['pool_maxsize'],
+        pool_block=settings['pool_block'],
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session():
+    """
+    The process-wide session, created on first use.
+
+    Shared by all threads: the connection pools are thread-safe, and callers
+    pass headers per request instead of changing session state.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session(load_http_settings())
+    return _session
+
+def get_cache():
+    """The shared on-disk HTTP cache, or None if caching is turned off"""
+    global _cache
+    if _cache is None:
+        with _session_lock:
+            if _cache is None:
+                settings = load_http_settings()
+                if not settings['cache']:
+                    _cache = False
+                else:
+                    from utils.http_cache import HttpCache
+                    _cache = HttpCache(settings['cache_dir'], settings['cache_max_bytes'])
+    return _cache or None
+
+def close_session():
+    """Close pooled connections; the next get_session() starts a new session"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
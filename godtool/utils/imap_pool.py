@@ -0,0 +1,233 @@
+import time
+import atexit
+import imaplib
+import logging
+import threading
+from contextlib import contextmanager
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_IMAP_POOL_SETTINGS = {
+    'max_connections': 2,          # Servers often cap concurrent logins per account
+    'keepalive_seconds': 240,      # NOOP idle connections this often; servers drop them after ~30 min
+    'validate_after_seconds': 30,  # NOOP a connection idle longer than this before handing it out
+    'max_idle_seconds': 3600,      # Log out connections nobody has used for this long
+    'timeout': 60
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def load_imap_pool_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('imap_pool', DEFAULT_IMAP_POOL_SETTINGS, settings_file)
+
+def open_connection(cfg, timeout=60):
+    """Log in to the account in cfg and select its inbox"""
+    required_fields = ['email', 'password', 'imap_server', 'imap_port']
+    for field in required_fields:
+        if field not in cfg or not cfg[field]:
+            raise ValueError(f"Missing required configuration: {field}")
+
+    try:
+        print(f"🔌 Connecting to {cfg['imap_server']}...")
+        mail = imaplib.IMAP4_SSL(cfg['imap_server'], cfg['imap_port'], timeout=timeout)
+        mail.login(cfg['email'], cfg['password'])
+
+        inbox = cfg.get('inbox_folder', 'INBOX')
+        result = mail.select(inbox)
+        if result[0] != 'OK':
+            raise Exception(f"Failed to select folder: {inbox}")
+
+        print(f"✅ Connected successfully to {cfg['email']}")
+        return mail
+
+    except imaplib.IMAP4.error as e:
+        raise Exception(f"IMAP connection error: {e}")
+    except Exception as e:
+        raise Exception(f"Email connection failed: {e}")
+
+def _close_quietly(mail):
+    try:
+        mail.logout()
+    except Exception:
+        try:
+            mail.shutdown()
+        except Exception:
+            pass
+
+class ImapPool:
+    """
+    Logged-in IMAP connections shared by threads.
+
+    A connection is used by one thread at a time: connection() checks one
+    out (reusing an idle one, or logging in if none is left) and returns it
+    afterwards. At most max_connections exist at once; further callers wait.
+    A background thread NOOPs idle connections so the server doesn't drop
+    them, and logs out those unused for max_idle_seconds. A connection that
+    has gone bad is thrown away and replaced with a new login.
+    """
+
+    def __init__(self, config, max_connections=2, keepalive_seconds=240, validate_after_seconds=30,
+                 max_idle_seconds=3600, timeout=60):
+        self.config = config
+        self.keepalive_seconds = keepalive_seconds
+        self.validate_after_seconds = validate_after_seconds
+        self.max_idle_seconds = max_idle_seconds
+        self.timeout = timeout
+        self.inbox = config.get('inbox_folder', 'INBOX')
+
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = []  # Entries: {'mail', 'folder', 'last_used', 'last_checked'}; most recent last
+        self._stop = threading.Event()
+        self._keepalive_thread = None
+
+    def _new_entry(self):
+        now = time.monotonic()
+        mail = open_connection(self.config, self.timeout)
+        return {'mail': mail, 'folder': self.inbox, 'last_used': now, 'last_checked': now}
+
+    def _alive(self, entry):
+        try:
+            ok = entry['mail'].noop()[0] == 'OK'
+        except (imaplib.IMAP4.error, OSError):
+            ok = False
+        if ok:
+            entry['last_checked'] = time.monotonic()
+        return ok
+
+    def _checkout(self):
+        """An idle connection that still answers, or a fresh one"""
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._new_entry()
+            if time.monotonic() - entry['last_checked'] < self.validate_after_seconds or self._alive(entry):
+                return entry
+            logging.info("Dropping dead IMAP connection")
+            _close_quietly(entry['mail'])
+
+    @contextmanager
+    def connection(self, folder=None):
+        """
+        Check out a connection with folder (default: the inbox) selected.
+
+        Don't log out or select another folder on it; pass folder instead.
+        """
+        folder = folder or self.inbox
+        self._slots.acquire()
+        entry = None
+        try:
+            entry = self._checkout()
+            if entry['folder'] != folder:
+                entry['folder'] = None  # Unknown until the select succeeds
+                if entry['mail'].select(folder)[0] != 'OK':
+                    raise Exception(f"Failed to select folder: {folder}")
+                entry['folder'] = folder
+            yield entry['mail']
+        except (imaplib.IMAP4.abort, OSError):
+            # The connection is broken; don't give it to anyone else
+            if entry:
+                _close_quietly(entry['mail'])
+                entry = None
+            raise
+        finally:
+            if entry:
+                entry['last_used'] = entry['last_checked'] = time.monotonic()
+                with self._lock:
+                    self._idle.append(entry)
+            self._slots.release()
+            self._start_keepalive()
+
+    def run(self, operation, folder=None, retries=1):
+        """
+        Call operation(mail) on a pooled connection. If the connection drops
+        midway, retry on a new one; only for operations safe to repeat.
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.connection(folder) as mail:
+                    return operation(mail)
+            except (imaplib.IMAP4.abort, OSError) as e:
+                if attempt == retries:
+                    raise
+                logging.warning(f"IMAP connection lost ({e}); reconnecting")
+
+    def _start_keepalive(self):
+        with self._lock:
+            if self._keepalive_thread is None and not self._stop.is_set():
+                self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name='godtool-imap-keepalive',
+                                                          daemon=True)
+                self._keepalive_thread.start()
+
+    def _keepalive_loop(self):
+        interval = max(1, min(self.keepalive_seconds, self.max_idle_seconds) / 2)
+        while not self._stop.wait(interval):
+            self.maintain()
+
+    def maintain(self):
+        """NOOP idle connections that are due, log out expired ones"""
+        now = time.monotonic()
+        with self._lock:
+            due = [entry for entry in self._idle
+                   if now - entry['last_used'] >= self.max_idle_seconds
+                   or now - entry['last_checked'] >= self.keepalive_seconds]
+
+        for entry in due:
+            # Take a slot so the connection can't be checked out while we talk to it
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                with self._lock:
+                    if entry not in self._idle:
+                        continue  # Someone checked it out meanwhile
+                    self._idle.remove(entry)
+
+                if now - entry['last_used'] >= self.max_idle_seconds:
+                    _close_quietly(entry['mail'])
+                elif self._alive(entry):
+                    with self._lock:
+                        self._idle.insert(0, entry)
+                else:
+                    logging.info("Dropping dead IMAP connection")
+                    _close_quietly(entry['mail'])
+            finally:
+                self._slots.release()
+
+    def close(self):
+        """Log out every idle connection and stop the keepalive thread"""
+        self._stop.set()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            _close_quietly(entry['mail'])
+
+def get_pool(load_config):
+    """
+    The process-wide pool, created on first use from load_config() and the
+    'imap_pool' settings.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = load_imap_pool_settings()
+                _pool = ImapPool(
+                    load_config(),
+                    max_connections=settings['max_connections'],
+                    keepalive_seconds=settings['keepalive_seconds'],
+                    validate_after_seconds=settings['validate_after_seconds'],
+                    max_idle_seconds=settings['max_idle_seconds'],
+                    timeout=settings['timeout']
+                )
+    return _pool
+
+def close_pool():
+    """Log out pooled connections; the next get_pool() starts a new pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+atexit.register(close_pool)
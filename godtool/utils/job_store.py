@@ -0,0 +1,289 @@
+import os
+import json
+import sqlite3
+import threading
+import logging
+
+class JsonJobStore:
+    """
+    Original storage format: the whole job list in one JSON file.
+
+    Every change rewrites the file, so this is only suitable for a handful of
+    jobs. Writes are serialized and go through a temp file + rename so a crash
+    never leaves a torn file behind.
+    """
+
+    def __init__(self, path='config/scheduled_jobs.json'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+        try:
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    text = f.read()
+                self._jobs = {job['id']: job for job in json.loads(text or '[]') if 'id' in job}
+        except Exception as e:
+            logging.error(f"Error loading jobs: {e}")
+
+    def _write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(list(self._jobs.values()), f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+    def load_all(self):
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def iter_jobs(self):
+        yield from self.load_all()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def add(self, job):
+        """Store a new job, assigning its id"""
+        with self._lock:
+            job['id'] = max(self._jobs, default=0) + 1
+            self._jobs[job['id']] = dict(job)
+            self._write()
+        return job['id']
+
+    def update(self, job):
+        with self._lock:
+            if job['id'] in self._jobs:
+                self._jobs[job['id']] = dict(job)
+                self._write()
+
+    def remove(self, job_id):
+        with self._lock:
+            if self._jobs.pop(job_id, None) is None:
+                return False
+            self._write()
+            return True
+
+    def clear(self):
+        with self._lock:
+            count = len(self._jobs)
+            self._jobs = {}
+            self._write()
+            return count
+
+    def count(self):
+        with self._lock:
+            return len(self._jobs)
+
+class SQLiteJobStore:
+    """
+    Job storage in a SQLite database running in WAL mode.
+
+    Each job is one row, so adding, updating or removing a job touches only
+    that row. The (status, next_run) index lets the daemon find due jobs
+    without scanning the table. Connections are per thread, as sqlite3
+    connections must not be shared between threads.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            next_run TEXT,
+            data TEXT NOT NULL,
+            lease_owner TEXT,
+            lease_expires REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status_next_run ON jobs (status, next_run);
+    """
+
+    def __init__(self, path='config/jobs.db'):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+
+        # Databases created before leases existed lack the lease columns
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for column, column_type in (('lease_owner', 'TEXT'), ('lease_expires', 'REAL')):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {column_type}')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_values(job):
+        return (job.get('type'), job.get('status'), job.get('next_run'), json.dumps(job, default=str))
+
+    def load_all(self):
+        return list(self.iter_jobs())
+
+    def iter_jobs(self):
+        """Yield jobs in id order without materializing the whole table"""
+        for (data,) in self._conn().execute('SELECT data FROM jobs ORDER BY id'):
+            yield json.loads(data)
+
+    def get(self, job_id):
+        row = self._conn().execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def due_jobs(self, now_iso, limit=100):
+        """Scheduled jobs whose next_run is at or before now_iso, earliest first"""
+        rows = self._conn().execute(
+            "SELECT data FROM jobs WHERE status = 'scheduled' AND next_run <= ? ORDER BY next_run LIMIT ?",
+            (now_iso, limit)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def add(self, job):
+        """Store a new job, assigning its id"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                'INSERT INTO jobs (type, status, next_run, data) VALUES (?, ?, ?, ?)',
+                self._row_values(job)
+            )
+            job['id'] = cursor.lastrowid
+            # The id lives inside the JSON blob too, so write it back
+            conn.execute('UPDATE jobs SET data = ? WHERE id = ?', (json.dumps(job, default=str), job['id']))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return job['id']
+
+    def update(self, job):
+        self._conn().execute(
+            'UPDATE jobs SET type = ?, status = ?, next_run = ?, data = ? WHERE id = ?',
+            self._row_values(job) + (job['id'],)
+        )
+
+    def remove(self, job_id):
+        cursor = self._conn().execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        cursor = self._conn().execute('DELETE FROM jobs')
+        return cursor.rowcount
+
+    def count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+    # Leases let several daemons share one database. A daemon claims a due
+    # job by atomically flipping it to 'running' with its own name and an
+    # expiry time, renews the lease while the job runs, and writes the
+    # result back only if it still holds the lease. A lease that expires
+    # (its daemon crashed) can be claimed by any other daemon.
+
+    def claim(self, job, owner, expected_next_run, now, lease_seconds):
+        """
+        Atomically take a due job (or one whose lease expired).
+
+        job holds the row to write on success (normally status 'running').
+        Returns:
+            bool: True if this owner now holds the lease
+        """
+        cursor = self._conn().execute(
+            """UPDATE jobs SET type = ?, status = ?, next_run = ?, data = ?, lease_owner = ?, lease_expires = ?
+               WHERE id = ? AND ((status = 'scheduled' AND next_run = ?)
+                                 OR (status = 'running' AND lease_expires < ?))""",
+            self._row_values(job) + (owner, now + lease_seconds, job['id'], expected_next_run, now)
+        )
+        return cursor.rowcount == 1
+
+    def renew_leases(self, job_ids, owner, expires):
+        """Extend this owner's leases; returns the ids it still holds"""
+        held = []
+        for job_id in job_ids:
+            cursor = self._conn().execute(
+                'UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ?',
+                (expires, job_id, owner)
+            )
+            if cursor.rowcount:
+                held.append(job_id)
+        return held
+
+    def release(self, job, owner):
+        """Write a finished job back and drop the lease, if the owner still holds it"""
+        cursor = self._conn().execute(
+            """UPDATE jobs SET type = ?, status = ?, next_run = ?, data = ?, lease_owner = NULL, lease_expires = NULL
+               WHERE id = ? AND lease_owner = ?""",
+            self._row_values(job) + (job['id'], owner)
+        )
+        return cursor.rowcount == 1
+
+    def expired_leases(self, now, limit=100):
+        """Running jobs whose daemon stopped renewing the lease"""
+        rows = self._conn().execute(
+            "SELECT data FROM jobs WHERE status = 'running' AND lease_expires < ? LIMIT ?",
+            (now, limit)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def import_jobs(self, jobs):
+        """Bulk insert jobs keeping their existing ids (used by the JSON migration)"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO jobs (id, type, status, next_run, data) VALUES (?, ?, ?, ?, ?)',
+                [(job['id'],) + self._row_values(job) for job in jobs if 'id' in job]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+def migrate_json_jobs(json_path, store):
+    """
+    One-time import of the legacy scheduled_jobs.json into a SQLite store.
+
+    The JSON file is renamed to <name>.migrated afterwards so the import
+    never runs twice.
+    """
+    if not os.path.exists(json_path):
+        return 0
+
+    try:
+        with open(json_path, 'r') as f:
+            text = f.read()
+        jobs = json.loads(text) if text.strip() else []
+    except Exception as e:
+        logging.error(f"Could not read {json_path} for migration: {e}")
+        return 0
+
+    store.import_jobs(jobs)
+    os.replace(json_path, f"{json_path}.migrated")
+    logging.info(f"Migrated {len(jobs)} jobs from {json_path} to {store.path}")
+    return len(jobs)
+
+def open_job_store(settings):
+    """
+    Create the job store selected by the 'job_store' scheduler setting.
+
+    'sqlite' (default) uses config/jobs.db and migrates the JSON file on
+    first use; 'json' keeps the old single-file format.
+    """
+    backend = settings.get('job_store', 'sqlite')
+    json_path = settings.get('jobs_file', 'config/scheduled_jobs.json')
+
+    if backend == 'json':
+        return JsonJobStore(json_path)
+    if backend == 'sqlite':
+        store = SQLiteJobStore(settings.get('jobs_db', 'config/jobs.db'))
+        migrate_json_jobs(json_path, store)
+        return store
+
+    raise ValueError(f"Unknown job store: {backend}")
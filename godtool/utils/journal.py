@@ -0,0 +1,139 @@
+import os
+import json
+import math
+import threading
+import logging
+from datetime import datetime
+
+class RunJournal:
+    """
+    Append-only log of scheduled job runs.
+
+    Each run is one compact JSON array per line:
+        [job_id, job_type, scheduled, started, ended, outcome, error]
+    with times as epoch seconds (millisecond precision). The file rotates
+    to .1, .2, ... once it passes max_bytes, keeping backup_count old files.
+    """
+
+    def __init__(self, path='logs/job_runs.jsonl', max_bytes=5 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+        for index in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{index}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def record(self, job_id, job_type, scheduled, started, ended, outcome, error=None):
+        """Append one run; times are datetimes or epoch seconds (scheduled may be None)"""
+        entry = [job_id, job_type, _epoch(scheduled), _epoch(started), _epoch(ended), outcome]
+        if error:
+            entry.append(str(error)[:500])
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+
+        with self._lock:
+            try:
+                f = self._open()
+                if f.tell() + len(line) > self.max_bytes and f.tell() > 0:
+                    self._rotate()
+                    f = self._open()
+                f.write(line)
+                f.flush()
+            except Exception as e:
+                logging.error(f"Could not write run journal: {e}")
+
+    def iter_records(self):
+        """Yield run records as dicts, oldest file first"""
+        paths = [f"{self.path}.{index}" for index in range(self.backup_count, 0, -1)] + [self.path]
+
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partially written last line
+                    yield {
+                        'job_id': entry[0],
+                        'type': entry[1],
+                        'scheduled': entry[2],
+                        'started': entry[3],
+                        'ended': entry[4],
+                        'outcome': entry[5],
+                        'error': entry[6] if len(entry) > 6 else None
+                    }
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+def _epoch(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.timestamp()
+    return round(value, 3)
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def compute_stats(records):
+    """
+    Summarize runs per job type.
+
+    Returns:
+        dict: job_type -> {'runs', 'outcomes', 'lag': {p50, p95, p99}, 'duration': {p50, p95, p99}}
+    """
+    lags = {}
+    durations = {}
+    outcomes = {}
+
+    for record in records:
+        job_type = record['type']
+        outcomes.setdefault(job_type, {})
+        outcomes[job_type][record['outcome']] = outcomes[job_type].get(record['outcome'], 0) + 1
+
+        if record['scheduled'] is not None and record['started'] is not None:
+            lags.setdefault(job_type, []).append(max(0.0, record['started'] - record['scheduled']))
+        if record['started'] is not None and record['ended'] is not None:
+            durations.setdefault(job_type, []).append(record['ended'] - record['started'])
+
+    stats = {}
+    for job_type, counts in outcomes.items():
+        type_lags = sorted(lags.get(job_type, []))
+        type_durations = sorted(durations.get(job_type, []))
+        stats[job_type] = {
+            'runs': sum(counts.values()),
+            'outcomes': counts,
+            'lag': {f"p{pct}": percentile(type_lags, pct) for pct in (50, 95, 99)},
+            'duration': {f"p{pct}": percentile(type_durations, pct) for pct in (50, 95, 99)}
+        }
+    return stats
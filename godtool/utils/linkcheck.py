@@ -0,0 +1,221 @@
+import os
+import time
+import sqlite3
+import logging
+import urllib.parse
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from utils.web_ops import fetch_page, check_url_status, map_per_host
+from utils.extract import iter_chunks
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_LINKCHECK_SETTINGS = {
+    'cache_db': 'cache/linkcheck.db',
+    'ttl_hours': 24,
+    'concurrency': 16,
+    'per_host_limit': 4,
+    'timeout': 10,
+    'max_sitemaps': 50  # Child sitemaps followed from a sitemap index
+}
+
+def load_linkcheck_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('linkcheck', DEFAULT_LINKCHECK_SETTINGS, settings_file)
+
+class LinkExtractor(HTMLParser):
+    """Collects link targets (a/area/link href, img/script/iframe/source src)"""
+
+    LINK_ATTRS = {'a': 'href', 'area': 'href', 'link': 'href', 'img': 'src',
+                  'script': 'src', 'iframe': 'src', 'source': 'src'}
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'base':
+            href = dict(attrs).get('href')
+            if href:
+                self.base_url = urllib.parse.urljoin(self.base_url, href)
+            return
+
+        attr = self.LINK_ATTRS.get(tag)
+        if attr:
+            value = dict(attrs).get(attr)
+            if value:
+                self.links.append(urllib.parse.urljoin(self.base_url, value.strip()))
+
+def normalize_url(url):
+    """Canonical form used for deduplication, or None for non-HTTP links"""
+    url, _ = urllib.parse.urldefrag(url)
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        return None  # mailto:, javascript:, tel:, data: ...
+    return urllib.parse.urlunsplit((parsed.scheme, parsed.netloc.lower(), parsed.path or '/', parsed.query, ''))
+
+def extract_links(html, base_url):
+    parser = LinkExtractor(base_url)
+    for chunk in iter_chunks(html):
+        parser.feed(chunk)
+    parser.close()
+    return parser.links
+
+def sitemap_locations(xml_text):
+    """
+    <loc> entries of a sitemap.
+
+    Returns:
+        tuple: (is_index, list of URLs); an index lists further sitemaps
+    """
+    root = ET.fromstring(xml_text)
+    is_index = root.tag.rsplit('}', 1)[-1] == 'sitemapindex'
+    locations = [element.text.strip() for element in root.iter() if element.tag.rsplit('}', 1)[-1] == 'loc' and element.text]
+    return is_index, locations
+
+def collect_links(source, max_sitemaps=50):
+    """
+    Links to check from a page or a sitemap (sitemap indexes are followed).
+
+    Returns:
+        list: unique normalized URLs, in first-seen order
+    """
+    result = fetch_page(source)
+    if not result['success']:
+        raise RuntimeError(f"Could not fetch {source}: {result['error']}")
+
+    content = result['content']
+    base_url = result['url'] or source
+    head = content[:512].lstrip()
+
+    if 'xml' in (result['content_type'] or '') or head.startswith('<?xml') or head.startswith('<urlset') \
+            or head.startswith('<sitemapindex'):
+        links = []
+        pending = [content]
+        followed = 0
+        while pending:
+            is_index, locations = sitemap_locations(pending.pop())
+            if not is_index:
+                links.extend(locations)
+                continue
+            for location in locations:
+                if followed >= max_sitemaps:
+                    logging.warning(f"Sitemap index lists more than {max_sitemaps} sitemaps; skipping the rest")
+                    break
+                followed += 1
+                child = fetch_page(location)
+                if child['success']:
+                    pending.append(child['content'])
+    else:
+        links = extract_links(content, base_url)
+
+    unique = {}
+    for link in links:
+        normalized = normalize_url(link)
+        if normalized:
+            unique.setdefault(normalized, None)
+    return list(unique)
+
+class LinkStatusCache:
+    """Results of earlier checks, reused until they are older than the TTL"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS links (
+            url TEXT PRIMARY KEY,
+            status_code INTEGER,
+            accessible INTEGER NOT NULL,
+            error TEXT,
+            checked REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path='cache/linkcheck.db', ttl_seconds=24 * 3600):
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def fresh_results(self, urls):
+        """Cached results for those urls that were checked within the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        results = {}
+        urls = list(urls)
+        for start in range(0, len(urls), 500):  # Stay under SQLite's variable limit
+            batch = urls[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT url, status_code, accessible, error FROM links "
+                f"WHERE checked >= ? AND url IN ({','.join('?' * len(batch))})",
+                [cutoff] + batch
+            )
+            for url, status_code, accessible, error in rows:
+                results[url] = {'url': url, 'status_code': status_code, 'accessible': bool(accessible),
+                                'error': error, 'cached': True}
+        return results
+
+    def save(self, results):
+        # Connection errors and timeouts may be transient, so only HTTP answers are kept
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO links (url, status_code, accessible, error, checked) VALUES (?, ?, ?, ?, ?)',
+            [(r['url'], r['status_code'], int(r['accessible']), r.get('error'), time.time())
+             for r in results if r['status_code'] is not None]
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+def check_links(urls, concurrency=16, per_host_limit=4, timeout=10, cache=None):
+    """
+    Check links concurrently, yielding each result dict as it is known.
+
+    Links with a fresh cached result are yielded first without a request.
+    """
+    fresh = cache.fresh_results(urls) if cache else {}
+    yield from fresh.values()
+
+    stale = [url for url in urls if url not in fresh]
+    checked = []
+    checker = lambda url: check_url_status(url, timeout=timeout, allow_redirects=True)
+    try:
+        for url, result in map_per_host(checker, stale, concurrency, per_host_limit):
+            result['cached'] = False
+            checked.append(result)
+            if cache and len(checked) >= 200:
+                cache.save(checked)
+                checked = []
+            yield result
+    finally:
+        if cache and checked:
+            cache.save(checked)
+
+def run_linkcheck(source, concurrency=None, per_host_limit=None, timeout=None, ttl_hours=None, show_all=False):
+    """CLI entry point: check every link on a page or in a sitemap"""
+    settings = load_linkcheck_settings()
+    concurrency = concurrency or settings['concurrency']
+    per_host_limit = per_host_limit or settings['per_host_limit']
+    timeout = timeout or settings['timeout']
+    ttl_hours = settings['ttl_hours'] if ttl_hours is None else ttl_hours
+
+    print(f"🔗 Collecting links from {source}")
+    urls = collect_links(source, settings['max_sitemaps'])
+    print(f"🔍 Checking {len(urls)} unique links ({concurrency} at a time, {per_host_limit} per host)")
+
+    cache = LinkStatusCache(settings['cache_db'], ttl_hours * 3600)
+    started = time.perf_counter()
+    ok = broken = cached = 0
+    try:
+        for result in check_links(urls, concurrency, per_host_limit, timeout, cache):
+            cached += result['cached']
+            if result['accessible']:
+                ok += 1
+                if show_all:
+                    print(f"✅ {result['status_code']}  {result['url']}")
+            else:
+                broken += 1
+                reason = result['status_code'] or result.get('error')
+                print(f"❌ {reason}  {result['url']}")
+    finally:
+        cache.close()
+
+    print(f"\n✨ {ok} ok, {broken} broken ({cached} from cache) in {time.perf_counter() - started:.2f}s")
+    return broken == 0
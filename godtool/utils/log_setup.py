@@ -0,0 +1,148 @@
+import os
+import gzip
+import json
+import time
+import queue
+import shutil
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timedelta
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_LOGGING_SETTINGS = {
+    'file': 'logs/scheduler.log',
+    'level': 'INFO',
+    'max_bytes': 10 * 1024 * 1024,
+    'backups': 7,
+    'rotate_when': 'midnight',  # 'midnight', 'hourly' or null for size-only rotation
+    'compress': True,
+    'json': False,
+    'console': True
+}
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+_queue_handler = None
+
+def load_logging_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('logging', DEFAULT_LOGGING_SETTINGS, settings_file)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, thread, msg (and exc)"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that also rolls over at midnight or on the hour.
+
+    Backups are numbered (.1 newest) whichever limit triggered the rollover.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, when=None):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.when = when
+        self.rollover_at = self._next_rollover(time.time())
+
+    def _next_rollover(self, now):
+        if self.when == 'midnight':
+            current = datetime.fromtimestamp(now)
+            return (current.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+        if self.when == 'hourly':
+            current = datetime.fromtimestamp(now)
+            return (current.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)).timestamp()
+        if self.when:
+            raise ValueError(f"Unknown rotate_when: {self.when}")
+        return None
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and record.created >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+
+def _gzip_namer(name):
+    return f"{name}.gz"
+
+def _gzip_rotator(source, dest):
+    """Compress the file being rotated out; runs on the listener thread"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def configure_logging(settings=None):
+    """
+    Route all logging through a queue to a background listener thread.
+
+    Logging calls only put the record on an in-memory queue, so job threads
+    never wait on disk. The listener writes to a rotating (optionally gzip
+    compressed) file and, if enabled, to the console. Calling it again
+    reconfigures.
+
+    Returns:
+        QueueListener: the running listener
+    """
+    global _listener, _queue_handler
+    settings = {**DEFAULT_LOGGING_SETTINGS, **(settings or {})}
+    shutdown_logging()
+
+    handlers = []
+    if settings['file']:
+        os.makedirs(os.path.dirname(settings['file']) or '.', exist_ok=True)
+        file_handler = SizeAndTimeRotatingFileHandler(
+            settings['file'],
+            max_bytes=settings['max_bytes'],
+            backup_count=settings['backups'],
+            when=settings['rotate_when']
+        )
+        if settings['compress']:
+            file_handler.namer = _gzip_namer
+            file_handler.rotator = _gzip_rotator
+        file_handler.setFormatter(JsonFormatter() if settings['json'] else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+
+    if settings['console']:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console_handler)
+
+    # SimpleQueue is unbounded, so put() never blocks the caller
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings['level'])
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging():
+    """Flush queued records and close the log files"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    listener, _listener, _queue_handler = _listener, None, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,451 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parseaddr, parsedate_to_datetime
+from utils.email_ops import load_config, fetch_headers, compress_uid_set, UID_IN_FETCH, FLAGS_IN_FETCH
+from utils.imap_pool import get_pool
+from utils.mail_sync import folder_status
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_MAIL_INDEX_SETTINGS = {
+    'db': 'config/mail_index.db',
+    'batch_size': 1000  # Messages per header fetch and per index commit
+}
+
+def load_mail_index_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('mail_index', DEFAULT_MAIL_INDEX_SETTINGS, settings_file)
+
+def _utc_date(value):
+    """Date header as a sortable UTC timestamp, or None if unparseable"""
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _fts_query(text):
+    """User words as an FTS5 query: every word must match, 'word*' matches a prefix"""
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms)
+
+class MailIndex:
+    """
+    Local copy of message headers and flags, one row per message.
+
+    Each folder remembers its UIDVALIDITY, the highest UID indexed and,
+    on CONDSTORE servers, the HIGHESTMODSEQ last seen, so a sync only
+    fetches headers of new messages and flags of changed ones. Subjects
+    are full-text indexed with FTS5 where SQLite has it.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS folders (
+            account TEXT NOT NULL,
+            folder TEXT NOT NULL,
+            uidvalidity INTEGER NOT NULL,
+            last_uid INTEGER NOT NULL,
+            synced TEXT NOT NULL,
+            highestmodseq INTEGER,
+            PRIMARY KEY (account, folder)
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY,
+            account TEXT NOT NULL,
+            folder TEXT NOT NULL,
+            uid INTEGER NOT NULL,
+            sender TEXT NOT NULL,
+            sender_name TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            date TEXT,
+            seen INTEGER NOT NULL,
+            flags TEXT NOT NULL,
+            UNIQUE (account, folder, uid)
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages (account, folder, sender);
+    """
+
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS subjects USING fts5(subject, content='messages', content_rowid='id');
+        CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO subjects (rowid, subject) VALUES (new.id, new.subject);
+        END;
+        CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO subjects (subjects, rowid, subject) VALUES ('delete', old.id, old.subject);
+        END;
+    """
+
+    def __init__(self, path='config/mail_index.db'):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._local = threading.local()
+        self.path = path
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+
+        # Indexes created before CONDSTORE support lack the modseq column
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(folders)')}
+        if 'highestmodseq' not in columns:
+            conn.execute('ALTER TABLE folders ADD COLUMN highestmodseq INTEGER')
+        try:
+            conn.executescript(self.FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            logging.warning("SQLite has no FTS5; subject search falls back to LIKE")
+            self.fts = False
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def folder_state(self, account, folder):
+        """(uidvalidity, last_uid, synced, highestmodseq), or None if the folder was never synced"""
+        return self._conn().execute(
+            'SELECT uidvalidity, last_uid, synced, highestmodseq FROM folders WHERE account = ? AND folder = ?',
+            (account, folder)
+        ).fetchone()
+
+    def set_folder_state(self, account, folder, uidvalidity, last_uid, highestmodseq=None):
+        with self._conn():
+            self._conn().execute(
+                'INSERT OR REPLACE INTO folders (account, folder, uidvalidity, last_uid, synced, highestmodseq) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (account, folder, uidvalidity, last_uid, datetime.now().isoformat(timespec='seconds'), highestmodseq)
+            )
+
+    def clear_folder(self, account, folder):
+        with self._conn():
+            self._conn().execute('DELETE FROM messages WHERE account = ? AND folder = ?', (account, folder))
+            self._conn().execute('DELETE FROM folders WHERE account = ? AND folder = ?', (account, folder))
+
+    def add_messages(self, account, folder, headers):
+        """Index fetched headers (uid -> fetch_headers() entry)"""
+        rows = []
+        for uid, header in headers.items():
+            name, address = parseaddr(header['from'])
+            rows.append((account, folder, uid, address.lower(), name, header['subject'], _utc_date(header['date']),
+                         int('\\Seen' in header['flags']), ' '.join(header['flags'])))
+        with self._conn():
+            self._conn().executemany(
+                'INSERT OR IGNORE INTO messages (account, folder, uid, sender, sender_name, subject, date, seen, flags) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+            )
+
+    def reconcile(self, account, folder, flags):
+        """
+        Bring flags up to date and drop expunged messages, given the
+        server's uid -> flags list for every message in the folder.
+
+        Returns:
+            tuple: (updated, removed)
+        """
+        conn = self._conn()
+        local = dict(conn.execute('SELECT uid, flags FROM messages WHERE account = ? AND folder = ?', (account, folder)))
+        gone = [(account, folder, uid) for uid in local if uid not in flags]
+        changed = [(int('\\Seen' in flags[uid]), ' '.join(flags[uid]), account, folder, uid)
+                   for uid, stored in local.items() if uid in flags and stored != ' '.join(flags[uid])]
+        with conn:
+            conn.executemany('DELETE FROM messages WHERE account = ? AND folder = ? AND uid = ?', gone)
+            conn.executemany('UPDATE messages SET seen = ?, flags = ? WHERE account = ? AND folder = ? AND uid = ?',
+                             changed)
+        return len(changed), len(gone)
+
+    def update_flags(self, account, folder, flags):
+        """Store the flags of some messages (uid -> flags); returns how many changed"""
+        rows = [(int('\\Seen' in names), ' '.join(names), account, folder, uid, ' '.join(names))
+                for uid, names in flags.items()]
+        with self._conn() as conn:
+            cursor = conn.executemany(
+                'UPDATE messages SET seen = ?, flags = ? WHERE account = ? AND folder = ? AND uid = ? AND flags != ?',
+                rows
+            )
+        return cursor.rowcount
+
+    def unseen_uids(self, account, folder):
+        """Set of uids indexed as unread"""
+        return {uid for uid, in self._conn().execute(
+            'SELECT uid FROM messages WHERE account = ? AND folder = ? AND seen = 0', (account, folder)
+        )}
+
+    def counts(self, account, folder):
+        """(total, unread) for a folder"""
+        total, unread = self._conn().execute(
+            'SELECT COUNT(*), COALESCE(SUM(seen = 0), 0) FROM messages WHERE account = ? AND folder = ?',
+            (account, folder)
+        ).fetchone()
+        return total, unread
+
+    def date_range(self, account, folder):
+        """(oldest, newest) message date in a folder"""
+        return self._conn().execute(
+            'SELECT MIN(date), MAX(date) FROM messages WHERE account = ? AND folder = ?', (account, folder)
+        ).fetchone()
+
+    def top_senders(self, account, folder, limit=10, recent=None):
+        """
+        Senders with the most messages, newest first on ties.
+
+        Returns:
+            list: (sender, name, total, unread) tuples
+        """
+        source = 'messages WHERE account = ? AND folder = ?'
+        params = [account, folder]
+        if recent:
+            # Only the most recent messages (highest UIDs)
+            source = f'(SELECT * FROM {source} ORDER BY uid DESC LIMIT ?)'
+            params.append(recent)
+        return self._conn().execute(
+            f'SELECT sender, MAX(sender_name), COUNT(*), SUM(seen = 0) FROM {source} '
+            f'GROUP BY sender ORDER BY COUNT(*) DESC, MAX(uid) DESC LIMIT ?', params + [limit]
+        ).fetchall()
+
+    def sender_counts(self, account, folder, sender):
+        """(total, unread) for one sender address"""
+        total, unread = self._conn().execute(
+            'SELECT COUNT(*), COALESCE(SUM(seen = 0), 0) FROM messages WHERE account = ? AND folder = ? AND sender = ?',
+            (account, folder, sender.strip().lower())
+        ).fetchone()
+        return total, unread
+
+    def search(self, account, folder, text, limit=50):
+        """
+        Messages whose subject contains every word of text, newest first.
+
+        Returns:
+            list: (uid, date, sender, subject, seen) tuples
+        """
+        columns = 'm.uid, m.date, m.sender, m.subject, m.seen'
+        if self.fts:
+            query = _fts_query(text)
+            if not query:
+                return []
+            return self._conn().execute(
+                f'SELECT {columns} FROM subjects JOIN messages m ON m.id = subjects.rowid '
+                f'WHERE subjects MATCH ? AND m.account = ? AND m.folder = ? ORDER BY m.date DESC, m.uid DESC LIMIT ?',
+                (query, account, folder, limit)
+            ).fetchall()
+
+        words = [word.rstrip('*') for word in text.split() if word.rstrip('*')]
+        if not words:
+            return []
+        where = ' AND '.join('m.subject LIKE ?' for _ in words)
+        return self._conn().execute(
+            f'SELECT {columns} FROM messages m WHERE m.account = ? AND m.folder = ? AND {where} '
+            f'ORDER BY m.date DESC, m.uid DESC LIMIT ?',
+            [account, folder] + [f'%{word}%' for word in words] + [limit]
+        ).fetchall()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """The shared mail index, opened on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MailIndex(load_mail_index_settings()['db'])
+    return _index
+
+def fetch_flags(mail, uid_set='1:*', changed_since=None):
+    """
+    uid -> flags of the messages in uid_set (default: the whole selected
+    folder), in one command. With changed_since (a CONDSTORE modseq) only
+    messages whose flags changed after it are returned.
+    """
+    query = '(UID FLAGS)' if changed_since is None else f'(UID FLAGS) (CHANGEDSINCE {changed_since})'
+    status, data = mail.uid('FETCH', uid_set, query)
+    if status != 'OK':
+        raise Exception("Failed to fetch flags")
+    flags = {}
+    for item in data:
+        line = (item[0] if isinstance(item, tuple) else item) or b''
+        uid, names = UID_IN_FETCH.search(line), FLAGS_IN_FETCH.search(line)
+        if uid and names:
+            flags[int(uid.group(1))] = names.group(1).decode().split()
+    return flags
+
+def changed_flags(mail, index, account, folder, status, known_modseq):
+    """
+    uid -> flags of indexed messages whose flags may have changed since
+    the last sync.
+
+    CONDSTORE servers are asked for flags changed since the stored
+    HIGHESTMODSEQ, which covers every flag. Elsewhere the server's unread
+    UIDs are compared with the index and only the differing messages are
+    fetched, so read/unread changes are caught but other flags (such as
+    \\Flagged) are only refreshed by a full sync.
+    """
+    if 'highestmodseq' in status:
+        if status['highestmodseq'] == known_modseq:
+            return {}
+        return fetch_flags(mail, changed_since=known_modseq)
+
+    search, data = mail.uid('SEARCH', None, 'UNSEEN')
+    if search != 'OK':
+        raise Exception("Failed to search unread emails")
+    unseen = set(map(int, data[0].split())) if data and data[0] else set()
+    differing = unseen ^ index.unseen_uids(account, folder)
+    flags = {}
+    for uid_set in compress_uid_set(differing):
+        flags.update(fetch_flags(mail, uid_set))
+    return flags
+
+def sync_folder(mail, account, folder, full=False, batch_size=None):
+    """
+    Bring the index of a folder up to date on a connection with that
+    folder selected.
+
+    New messages have their headers fetched. Expunges show up as a
+    message count that no longer matches the server once new messages are
+    indexed, and then (or with full=True) the flags of the whole folder
+    are re-read in one command. Otherwise only changed flags are fetched
+    (see changed_flags()), so a quiet CONDSTORE folder costs one STATUS.
+
+    Returns:
+        dict: counts of 'added', 'updated' and 'removed' messages
+    """
+    index = get_index()
+    batch_size = batch_size or load_mail_index_settings()['batch_size']
+    status = folder_status(mail, folder)
+    state = index.folder_state(account, folder)
+    if state and state[0] != status['uidvalidity']:
+        # The server renumbered the folder; the old uids mean nothing now
+        index.clear_folder(account, folder)
+        state = None
+    last_uid = state[1] if state else 0
+    modseq = status.get('highestmodseq')
+    highest = status['uidnext'] - 1
+    result = {'added': 0, 'updated': 0, 'removed': 0}
+
+    if highest > last_uid:
+        query = f"UID {last_uid + 1}:*" if last_uid else 'ALL'
+        search, data = mail.uid('SEARCH', None, query)
+        if search != 'OK':
+            raise Exception("Failed to search emails")
+        uids = [uid for uid in map(int, data[0].split()) if uid > last_uid] if data and data[0] else []
+        for start in range(0, len(uids), batch_size):
+            batch = uids[start:start + batch_size]
+            index.add_messages(account, folder, fetch_headers(mail, batch, batch_size))
+            # Progress is kept per batch, so an interrupted first sync resumes
+            last_uid = max(last_uid, batch[-1])
+            index.set_folder_state(account, folder, status['uidvalidity'], last_uid, state and state[3])
+            result['added'] += len(batch)
+        last_uid = max(last_uid, highest)
+
+    # An expunge leaves more messages indexed than the server has, even when
+    # new arrivals bring the unread count back; an index synced before the
+    # server offered CONDSTORE has no modseq to ask for changes since
+    if full or index.counts(account, folder)[0] != status['messages'] or (state and modseq and not state[3]):
+        flags = fetch_flags(mail) if status['messages'] else {}
+        result['updated'], result['removed'] = index.reconcile(account, folder, flags)
+    elif state:
+        # Messages added above came with current flags; only older ones can be stale
+        result['updated'] = index.update_flags(account, folder,
+                                               changed_flags(mail, index, account, folder, status, state[3]))
+    index.set_folder_state(account, folder, status['uidvalidity'], last_uid, modseq)
+    return result
+
+def sync_index(folder=None, full=False):
+    """Sync the index of one folder (default: the inbox) through the shared pool"""
+    pool = get_pool(load_config)
+    cfg = pool.config
+    folder = folder or cfg.get('inbox_folder', 'INBOX')
+    with pool.connection(folder) as mail:
+        return sync_folder(mail, cfg['email'], folder, full)
+
+def _account_folder(folder):
+    cfg = load_config()
+    return cfg['email'], folder or cfg.get('inbox_folder', 'INBOX')
+
+def _sync_or_warn(folder, full):
+    try:
+        started = time.perf_counter()
+        result = sync_index(folder, full)
+        changes = ', '.join(f"{count} {name}" for name, count in result.items() if count)
+        print(f"🔄 Index synced in {time.perf_counter() - started:.2f}s{f' ({changes})' if changes else ''}")
+    except Exception as e:
+        print(f"⚠️  Could not sync the mail index ({e}); showing what was indexed before")
+
+def _indexed(account, folder):
+    state = get_index().folder_state(account, folder)
+    if not state:
+        print(f"📭 {folder} hasn't been indexed yet; run without --offline first")
+    return state
+
+def show_stats(folder=None, top=10, sender=None, recent=None, offline=False, full=False):
+    """Print mailbox statistics from the local index"""
+    account, folder = _account_folder(folder)
+    if not offline:
+        _sync_or_warn(folder, full)
+    index = get_index()
+    state = _indexed(account, folder)
+    if not state:
+        return None
+
+    total, unread = index.counts(account, folder)
+    oldest, newest = index.date_range(account, folder)
+    print(f"📊 {folder} ({total} emails, indexed {state[2]}):")
+    print(f"   📬 Unread: {unread}")
+    print(f"   📖 Read: {total - unread}")
+    if oldest:
+        print(f"   📅 {oldest[:10]} to {newest[:10]}")
+
+    if sender:
+        sender_total, sender_unread = index.sender_counts(account, folder, sender)
+        print(f"\n📧 {sender}: {sender_total} emails, {sender_unread} unread")
+    elif top:
+        print()
+        show_top_senders(folder, top, recent, offline=True)
+    return {'total': total, 'unread': unread, 'read': total - unread}
+
+def show_top_senders(folder=None, limit=10, recent=None, offline=False):
+    """Print the senders with the most emails, optionally among the recent ones only"""
+    account, folder = _account_folder(folder)
+    if not offline:
+        _sync_or_warn(folder, False)
+    if not _indexed(account, folder):
+        return None
+
+    senders = get_index().top_senders(account, folder, limit, recent)
+    print(f"👥 Top {len(senders)} senders{f' of the last {recent} emails' if recent else ''}:")
+    for address, name, count, unread in senders:
+        label = f"{name} <{address}>" if name else address
+        print(f"   {count:>6}  {label}{f' ({unread} unread)' if unread else ''}")
+    return senders
+
+def search_subjects(text, folder=None, limit=50, offline=False):
+    """Print indexed emails whose subject matches every word of text"""
+    account, folder = _account_folder(folder)
+    if not offline:
+        _sync_or_warn(folder, False)
+    if not _indexed(account, folder):
+        return []
+    started = time.perf_counter()
+    rows = get_index().search(account, folder, text, limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    if not rows:
+        print(f"🔍 No subjects in {folder} match '{text}'")
+        return rows
+    print(f"🔍 {len(rows)} emails in {folder} match '{text}' ({elapsed:.1f} ms):")
+    for uid, date, address, subject, seen in rows:
+        print(f"   {'  ' if seen else '● '}{(date or '')[:10]:<10}  {address[:30]:<30}  {subject[:60]}")
+    return rows
@@ -0,0 +1,182 @@
+import re
+import json
+import os
+from email.utils import parseaddr
+from utils.email_ops import (load_config, create_folder_if_not_exists, fetch_headers, move_messages,
+                             sort_sender_messages, PREVIEW_LIMIT)
+from utils.imap_pool import get_pool
+from utils.mail_sync import new_uids, run_idle
+
+DEFAULT_RULES_FILE = 'config/mail_rules.json'
+
+class RuleIndex:
+    """
+    Sorting rules arranged for lookup.
+
+    Sender addresses and domains go into dicts, so matching a message costs
+    one lookup per label of its domain however many rules there are. Subject
+    patterns are regexes and are tried in file order. An address rule beats
+    a domain rule, a domain rule beats a subject rule; a more specific domain
+    beats its parent, and otherwise the first rule in the file wins.
+    """
+
+    def __init__(self, rules):
+        self.senders = {}
+        self.domains = {}
+        self.subjects = []
+        for number, rule in enumerate(rules, 1):
+            folder = rule.get('folder')
+            if not folder:
+                raise ValueError(f"Rule {number} has no 'folder'")
+            keys = [key for key in ('from', 'domain', 'subject') if key in rule]
+            if len(keys) != 1:
+                raise ValueError(f"Rule {number} needs exactly one of 'from', 'domain' or 'subject'")
+
+            values = rule[keys[0]] if isinstance(rule[keys[0]], list) else [rule[keys[0]]]
+            for value in values:
+                if keys[0] == 'from':
+                    self.senders.setdefault(value.strip().lower(), folder)
+                elif keys[0] == 'domain':
+                    self.domains.setdefault(value.strip().lower().lstrip('@').lstrip('.'), folder)
+                else:
+                    try:
+                        self.subjects.append((re.compile(value, re.IGNORECASE), folder))
+                    except re.error as e:
+                        raise ValueError(f"Rule {number} has a bad subject pattern {value!r}: {e}")
+
+    def __len__(self):
+        return len(self.senders) + len(self.domains) + len(self.subjects)
+
+    def match(self, sender, subject):
+        """Target folder for a message, or None if no rule applies"""
+        address = parseaddr(sender)[1].lower()
+        if address in self.senders:
+            return self.senders[address]
+
+        domain = address.rpartition('@')[2]
+        while domain:
+            if domain in self.domains:
+                return self.domains[domain]
+            domain = domain.partition('.')[2]  # mail.example.com -> example.com
+
+        for pattern, folder in self.subjects:
+            if pattern.search(subject):
+                return folder
+        return None
+
+def load_rules(rules_file=DEFAULT_RULES_FILE):
+    """Rules file as a dict with a RuleIndex under 'index'"""
+    if not os.path.exists(rules_file):
+        raise FileNotFoundError(f"Rules file not found: {rules_file}")
+    try:
+        with open(rules_file) as f:
+            rules = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in rules file: {e}")
+
+    rules['index'] = RuleIndex(rules.get('rules', []))
+    return rules
+
+def plan_moves(index, headers):
+    """Group message uids by target folder: {folder: [uid, ...]}"""
+    moves = {}
+    for uid, header in headers.items():
+        folder = index.match(header['from'], header['subject'])
+        if folder:
+            moves.setdefault(folder, []).append(uid)
+    return moves
+
+def sort_by_rules(mail, cfg, rules, rules_file, dry_run=False, full=False):
+    """
+    One rules pass over emails that arrived since the last pass with this
+    rules file (all of them with full=True) on an open connection.
+
+    Returns:
+        dict: folder -> moved count (uids per folder for a dry run)
+    """
+    index = rules['index']
+    unseen_only = rules.get('unseen_only', True)
+    batch_size = cfg.get('settings', {}).get('header_batch_size', 1000)
+
+    print(f"🔍 Matching {len(index)} rules against {'unread' if unseen_only else 'all'} emails")
+    uids, commit = new_uids(mail, cfg.get('inbox_folder', 'INBOX'), f"rules:{os.path.abspath(rules_file)}",
+                            cfg['email'], 'UNSEEN' if unseen_only else 'ALL', full)
+    if not uids:
+        print("📭 No new emails to sort")
+        if not dry_run:
+            commit()
+        return {}
+
+    headers = fetch_headers(mail, uids, batch_size)
+    moves = plan_moves(index, headers)
+    if not moves:
+        print(f"📭 None of {len(uids)} emails matched a rule")
+        if not dry_run:
+            commit()
+        return {}
+
+    results = {}
+    for folder, folder_uids in sorted(moves.items()):
+        print(f"📁 {folder}: {len(folder_uids)} emails")
+        for uid in folder_uids[:PREVIEW_LIMIT]:
+            subject = headers[uid]['subject']
+            print(f"   📧 {subject[:50]}{'...' if len(subject) > 50 else ''}")
+        if len(folder_uids) > PREVIEW_LIMIT:
+            print(f"   ... and {len(folder_uids) - PREVIEW_LIMIT} more")
+
+        if dry_run:
+            continue
+        create_folder_if_not_exists(mail, folder)
+        try:
+            results[folder] = move_messages(mail, folder_uids, folder)
+        except Exception as e:
+            print(f"❌ Failed to move emails to {folder}: {e}")
+            results[folder] = 0
+
+    if dry_run:
+        print(f"\n🧪 Dry run: {sum(len(u) for u in moves.values())} of {len(uids)} emails would be moved")
+        return moves
+
+    # A failed folder keeps the checkpoint where it was, so those emails are retried
+    if all(results[folder] for folder in moves):
+        commit()
+    print(f"\n📊 Rule Sorting Summary:")
+    print(f"   📬 Checked: {len(uids)}")
+    print(f"   ✅ Moved: {sum(results.values())} into {len([c for c in results.values() if c])} folders")
+    return results
+
+def apply_mail_rules(rules_file=None, dry_run=False, full=False):
+    """
+    Sort the inbox by every rule in one pass: one search, batched header
+    fetches, then one bulk move per target folder.
+    """
+    rules_file = rules_file or DEFAULT_RULES_FILE
+    rules = load_rules(rules_file)
+    if not len(rules['index']):
+        print("📭 No rules to apply")
+        return {}
+
+    pool = get_pool(load_config)
+    with pool.connection() as mail:
+        return sort_by_rules(mail, pool.config, rules, rules_file, dry_run, full)
+
+def sort_on_arrival(sender=None, rules_file=None, full=False):
+    """
+    Stay connected and sort new mail the moment the server announces it
+    (IMAP IDLE), by one sender or by the rules file.
+    """
+    cfg = load_config()
+    if not sender:
+        rules_file = rules_file or DEFAULT_RULES_FILE
+        rules = load_rules(rules_file)
+
+    # Only the first pass may be a full one; after that just the new mail
+    state = {'full': full}
+    def sync(mail):
+        full, state['full'] = state['full'], False
+        if sender:
+            sort_sender_messages(mail, cfg, sender, full)
+        else:
+            sort_by_rules(mail, cfg, rules, rules_file, full=full)
+
+    run_idle(cfg, sync)
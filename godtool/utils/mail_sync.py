@@ -0,0 +1,261 @@
+import os
+import re
+import time
+import ssl
+import select
+import sqlite3
+import imaplib
+import logging
+import threading
+from datetime import datetime
+from utils.imap_pool import open_connection
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_MAIL_SYNC_SETTINGS = {
+    'db': 'config/mail_sync.db',
+    'idle_seconds': 600,       # Restart IDLE this often (servers drop it after ~30 min)
+    'poll_seconds': 300,       # Check interval for servers without IDLE
+    'reconnect_seconds': 30    # Wait before reconnecting after a dropped connection
+}
+
+def load_mail_sync_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('mail_sync', DEFAULT_MAIL_SYNC_SETTINGS, settings_file)
+
+class CheckpointStore:
+    """
+    How far each consumer (a sender sort, a rules file, ...) has got in
+    each folder: the folder's UIDVALIDITY and the highest UID already seen.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            account TEXT NOT NULL,
+            folder TEXT NOT NULL,
+            consumer TEXT NOT NULL,
+            uidvalidity INTEGER NOT NULL,
+            last_uid INTEGER NOT NULL,
+            updated TEXT NOT NULL,
+            PRIMARY KEY (account, folder, consumer)
+        );
+    """
+
+    def __init__(self, path='config/mail_sync.db'):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._local = threading.local()
+        self.path = path
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, account, folder, consumer):
+        """(uidvalidity, last_uid), or None before the first run"""
+        return self._conn().execute(
+            'SELECT uidvalidity, last_uid FROM checkpoints WHERE account = ? AND folder = ? AND consumer = ?',
+            (account, folder, consumer)
+        ).fetchone()
+
+    def set(self, account, folder, consumer, uidvalidity, last_uid):
+        with self._conn():
+            self._conn().execute(
+                'INSERT OR REPLACE INTO checkpoints (account, folder, consumer, uidvalidity, last_uid, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (account, folder, consumer, uidvalidity, last_uid, datetime.now().isoformat(timespec='seconds'))
+            )
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_checkpoints():
+    """The shared checkpoint store, opened on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CheckpointStore(load_mail_sync_settings()['db'])
+    return _store
+
+STATUS_ITEM = re.compile(rb'(UIDVALIDITY|UIDNEXT|MESSAGES|UNSEEN|HIGHESTMODSEQ) (\d+)')
+
+def folder_status(mail, folder):
+    """
+    UIDVALIDITY, UIDNEXT, MESSAGES and UNSEEN of a folder in one STATUS
+    round trip, plus HIGHESTMODSEQ on servers with CONDSTORE.
+    """
+    quoted = '"' + folder.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    items = 'UIDVALIDITY UIDNEXT MESSAGES UNSEEN'
+    if 'CONDSTORE' in mail.capabilities:
+        items += ' HIGHESTMODSEQ'
+    status, data = mail.status(quoted, f'({items})')
+    if status != 'OK':
+        raise Exception(f"Failed to get status of {folder}")
+    return {name.decode().lower(): int(value) for name, value in STATUS_ITEM.findall(data[0])}
+
+def new_uids(mail, folder, consumer, account, criteria='ALL', full=False):
+    """
+    UIDs matching criteria that arrived since consumer's last run.
+
+    If UIDNEXT hasn't moved since then, no search is sent at all. A changed
+    UIDVALIDITY (the server renumbered the folder) or full=True means a
+    full search.
+
+    Returns:
+        tuple: (uids, commit) -- call commit() once the uids are handled
+        to move the checkpoint past them
+    """
+    store = get_checkpoints()
+    status = folder_status(mail, folder)
+    saved = None if full else store.get(account, folder, consumer)
+    last_uid = saved[1] if saved and saved[0] == status['uidvalidity'] else 0
+    highest = status['uidnext'] - 1
+
+    uids = []
+    if highest > last_uid:
+        query = f"(UID {last_uid + 1}:* {criteria})" if last_uid else f"({criteria})"
+        result, data = mail.uid('SEARCH', None, query)
+        if result != 'OK':
+            raise Exception("Failed to search emails")
+        # n:* always matches the newest message, even below n
+        uids = [uid for uid in map(int, data[0].split()) if uid > last_uid] if data and data[0] else []
+
+    def commit():
+        store.set(account, folder, consumer, status['uidvalidity'], max([highest, last_uid] + uids))
+    return uids, commit
+
+def _start_raw_command(mail, command):
+    """
+    Send a tagged command imaplib has no method for and return its tag.
+
+    This is the one place that leans on imaplib internals: _new_tag() keeps
+    tags unique on the connection, and the tag is registered in
+    tagged_commands like imaplib's own. The caller reads the responses
+    itself up to the tagged completion, then calls _end_raw_command.
+    """
+    tag = mail._new_tag()
+    mail.tagged_commands[tag] = None
+    mail.send(tag + b' ' + command.encode() + b'\r\n')
+    return tag
+
+def _end_raw_command(mail, tag):
+    mail.tagged_commands.pop(tag, None)
+
+def _readable_now(mail):
+    """
+    True if a response line can be read without waiting.
+
+    Bytes may already sit in imaplib's buffered reader or in the SSL layer,
+    where select() can't see them; peek at them without blocking.
+    """
+    timeout = mail.sock.gettimeout()
+    mail.sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (ssl.SSLWantReadError, BlockingIOError):
+        return False
+    finally:
+        mail.sock.settimeout(timeout)
+
+def idle_wait(mail, timeout):
+    """
+    Block in IMAP IDLE until the server reports a change to the selected
+    folder or timeout seconds pass.
+
+    Returns:
+        bool: True if the server pushed something
+    """
+    tag = _start_raw_command(mail, 'IDLE')
+    try:
+        if not mail.readline().startswith(b'+'):
+            raise imaplib.IMAP4.error("Server refused IDLE")
+
+        pushed = False
+        deadline = time.monotonic() + timeout
+        while not pushed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not _readable_now(mail) and not select.select([mail.sock], [], [], remaining)[0]:
+                continue
+            line = mail.readline()
+            if not line or line.startswith(b'* BYE'):
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            # EXISTS, EXPUNGE, FETCH (flag changes)...: sync and idle again
+            pushed = True
+
+        mail.send(b'DONE\r\n')
+        while True:
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed ending IDLE")
+            if line.startswith(tag):
+                break
+            # A change announced just as IDLE ended still counts
+            pushed = True
+        return pushed
+    finally:
+        _end_raw_command(mail, tag)
+
+def _sync_and_report(sync, mail):
+    """Run one sync; a failed sort is reported and the watch carries on"""
+    try:
+        sync(mail)
+    except (imaplib.IMAP4.abort, OSError):
+        raise  # The connection is gone; run_idle reconnects
+    except Exception as e:
+        logging.error(f"Mail sync failed: {e}")
+        print(f"❌ Sorting failed: {e}")
+
+def run_idle(cfg, sync, folder=None):
+    """
+    Call sync(mail) now and again whenever the server pushes a change.
+
+    Holds its own connection (IDLE ties it up), reconnects after drops, and
+    falls back to polling on servers without IDLE. Runs until interrupted.
+    """
+    settings = load_mail_sync_settings()
+    folder = folder or cfg.get('inbox_folder', 'INBOX')
+
+    while True:
+        try:
+            mail = open_connection(cfg)
+        except Exception as e:
+            print(f"⚠️  {e}; retrying in {settings['reconnect_seconds']}s")
+            time.sleep(settings['reconnect_seconds'])
+            continue
+
+        try:
+            if folder != cfg.get('inbox_folder', 'INBOX') and mail.select(folder)[0] != 'OK':
+                raise Exception(f"Failed to select folder: {folder}")
+            can_idle = 'IDLE' in mail.capabilities
+            print(f"👂 Waiting for new mail in {folder} ({'IDLE' if can_idle else 'polling'}; Ctrl+C to stop)")
+
+            _sync_and_report(sync, mail)
+            while True:
+                if can_idle:
+                    pushed = idle_wait(mail, settings['idle_seconds'])
+                else:
+                    time.sleep(settings['poll_seconds'])
+                    mail.noop()
+                    pushed = True
+                if pushed:
+                    _sync_and_report(sync, mail)
+                else:
+                    mail.noop()  # Keep the connection alive between IDLE rounds
+
+        except (imaplib.IMAP4.abort, OSError) as e:
+            print(f"⚠️  Connection lost ({e}); reconnecting in {settings['reconnect_seconds']}s")
+            time.sleep(settings['reconnect_seconds'])
+        except Exception as e:
+            # A refused IDLE, a folder that can't be selected...: start over on a new connection
+            print(f"⚠️  {e}; reconnecting in {settings['reconnect_seconds']}s")
+            time.sleep(settings['reconnect_seconds'])
+        finally:
+            try:
+                mail.logout()
+            except Exception:
+                pass
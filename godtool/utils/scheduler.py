@@ -1,62 +1,267 @@
 import time
-import json
 import os
+import heapq
+import random
 import threading
+from collections import deque
 import signal
-import sys
+import socket
 from datetime import datetime, timedelta
 import logging
-import pytz
-from utils import file_ops, youtube_ops, pdf_ops, email_ops, web_ops
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/scheduler.log'),
-        logging.StreamHandler()
-    ]
-)
+from utils.executor import JobExecutor, run_operation
+from utils.job_store import open_job_store, SQLiteJobStore
+from utils.control import ControlServer, send_command
+from utils.journal import RunJournal, compute_stats
+from utils.log_setup import configure_logging, load_logging_settings
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+# Longest the daemon sleeps without re-checking the queue (guards against clock jumps)
+MAX_IDLE_WAIT = 60
+
+DEFAULT_SCHEDULER_SETTINGS = {
+    'job_store': 'sqlite',
+    'jobs_db': 'config/jobs.db',
+    'jobs_file': 'config/scheduled_jobs.json',
+    'control_socket': 'config/scheduler.sock',
+    'journal_file': 'logs/job_runs.jsonl',
+    'journal_max_bytes': 5 * 1024 * 1024,
+    'journal_backups': 5,
+    'max_workers': 4,
+    'type_limits': {'yt': 2},
+    'cpu_workers': 2,
+    'cpu_job_types': ['pdfmerge'],
+    'job_timeouts': {'default': 3600, 'fetch': 120, 'watch': 120, 'sortemail': 600, 'pdfmerge': 1800, 'yt': 7200},
+    'misfire_policy': 'coalesce',
+    'misfire_grace_seconds': 60,
+    'catchup_rate': 2,
+    'jitter_seconds': 0,
+    'cluster': False,
+    'node_id': None,
+    'lease_seconds': 60,
+    'cluster_poll_seconds': 5
+}
+
+MISFIRE_POLICIES = ('coalesce', 'skip', 'all')
+
+def load_scheduler_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('scheduler', DEFAULT_SCHEDULER_SETTINGS, settings_file)
+
+def next_slot(job, slot, now, catch_up=False):
+    """
+    Next schedule slot after `slot` for a recurring job (None for one-time jobs).
+
+    Slots are anchored on the previous slot rather than on when the job
+    finished, so interval jobs keep their cadence. Unless catch_up is set,
+    slots that are already in the past are skipped.
+    """
+    if job.get('interval'):
+        step = timedelta(minutes=job['interval'])
+    elif job.get('daily') and job.get('schedule_time'):
+        step = timedelta(days=1)
+    else:
+        return None
+
+    upcoming = slot + step
+    if not catch_up and upcoming <= now:
+        upcoming += ((now - upcoming) // step + 1) * step
+    return upcoming
+
+class TokenBucket:
+    """Simple rate limiter: `rate` tokens per second, bursts up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self):
+        if self.rate <= 0:
+            return True  # Unlimited
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self):
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
 
 class JobScheduler:
-    def __init__(self):
-        self.jobs_file = 'config/scheduled_jobs.json'
-        self.daemon_running = False
-        self.jobs = self.load_jobs()
-        self.job_counter = max([job.get('id', 0) for job in self.jobs], default=0) + 1
-
+    def __init__(self, clock=datetime.now, settings=None):
+        """
+        Args:
+            clock: callable returning the current (naive) datetime; the
+                benchmarks pass a virtual clock here
+            settings: scheduler settings; read from settings.json if omitted
+        """
         # Ensure directories exist
         os.makedirs('config', exist_ok=True)
         os.makedirs('logs', exist_ok=True)
 
+        self.clock = clock
+        self.daemon_running = False
+        self.settings = settings or load_scheduler_settings()
+        self.store = open_job_store(self.settings)
+
+        # Cluster mode: several daemons share one SQLite job store and claim
+        # due jobs with expiring leases, so each run happens on one daemon
+        self.cluster = self.settings['cluster']
+        self.node_id = self.settings['node_id'] or f"{socket.gethostname()}:{os.getpid()}"
+        if self.cluster and not isinstance(self.store, SQLiteJobStore):
+            raise ValueError("Cluster mode needs the sqlite job store")
+        self._leased = set()
+        self._last_cluster_sync = None
+        self.journal = RunJournal(
+            self.settings['journal_file'],
+            max_bytes=self.settings['journal_max_bytes'],
+            backup_count=self.settings['journal_backups']
+        )
+        self.executor = None  # Created when the daemon starts
+
+        # Min-heap of (next_run datetime, job id, next_run string). Entries are
+        # never removed in place: an entry is stale once the job is gone or its
+        # next_run no longer matches, and stale entries are dropped when popped.
+        self._timers = []
+        self._lock = threading.RLock()
+        # Set whenever the queue changes so a sleeping daemon re-checks it
+        self._wakeup = threading.Event()
+
+        # Overdue jobs waiting for a catch-up token (see run_daemon)
+        self._catchup = deque()
+        self._catchup_limiter = None
+
+        # In-memory job index, only filled when the daemon runs. One-off CLI
+        # commands go straight to the store so they never load every job.
+        self.jobs = {}
+
     def load_jobs(self):
-        """Load scheduled jobs from file"""
+        """Load every job from the store into memory and queue its timer"""
+        with self._lock:
+            self.jobs = {job['id']: job for job in self.store.iter_jobs()}
+            self._timers = []
+        for job in self.jobs.values():
+            self._push_timer(job)
+        return self.jobs
+
+    def save_job(self, job):
+        """Persist a single job"""
         try:
-            if os.path.exists(self.jobs_file):
-                with open(self.jobs_file, 'r') as f:
-                    return json.load(f)
+            self.store.update(job)
         except Exception as e:
-            logging.error(f"Error loading jobs: {e}")
-        return []
+            logging.error(f"Error saving job {job.get('id')}: {e}")
+
+    def _push_timer(self, job):
+        """Queue a scheduled job on the timer heap and wake the daemon"""
+        if job.get('status') != 'scheduled' or not job.get('next_run'):
+            return
 
-    def save_jobs(self):
-        """Save scheduled jobs to file"""
         try:
-            with open(self.jobs_file, 'w') as f:
-                json.dump(self.jobs, f, indent=2, default=str)
-        except Exception as e:
-            logging.error(f"Error saving jobs: {e}")
+            next_run = datetime.fromisoformat(job['next_run'])
+        except (TypeError, ValueError):
+            logging.error(f"Job {job.get('id')} has invalid next_run: {job.get('next_run')}")
+            return
+
+        with self._lock:
+            heapq.heappush(self._timers, (next_run, job['id'], job['next_run']))
+            # Rebuild once stale entries outnumber live ones
+            if len(self._timers) > 2 * len(self.jobs) + 64:
+                self._compact_timers()
+            self._wakeup.set()
+
+    def _compact_timers(self):
+        """Drop stale heap entries (caller holds self._lock)"""
+        self._timers = [entry for entry in self._timers if self._timer_is_live(entry)]
+        heapq.heapify(self._timers)
+
+    def _timer_is_live(self, entry):
+        """A heap entry is live while its job still exists with the same next_run"""
+        _, job_id, next_run = entry
+        job = self.jobs.get(job_id)
+        return job is not None and job.get('status') == 'scheduled' and job.get('next_run') == next_run
+
+    def _pop_due_jobs(self, now):
+        """Pop every job due at or before now (caller holds self._lock)"""
+        due = []
+        while self._timers and self._timers[0][0] <= now:
+            entry = heapq.heappop(self._timers)
+            if self._timer_is_live(entry):
+                due.append(self.jobs[entry[1]])
+        return due
+
+    def _seconds_until_next(self, now):
+        """Seconds until the earliest live deadline, or None if the queue is empty"""
+        while self._timers and not self._timer_is_live(self._timers[0]):
+            heapq.heappop(self._timers)
+        if not self._timers:
+            return None
+        return max(0.0, (self._timers[0][0] - now).total_seconds())
+
+    def _set_next_run(self, job, slot):
+        """Store the schedule slot and the (optionally jittered) time it actually fires"""
+        if slot is None:
+            job['slot'] = job['next_run'] = None
+            return
+
+        jitter = job.get('jitter')
+        if jitter is None:
+            jitter = self.settings['jitter_seconds']
+        job['slot'] = slot.isoformat()
+        job['next_run'] = (slot + timedelta(seconds=random.uniform(0, jitter) if jitter else 0)).isoformat()
+
+    def misfire_policy(self, job):
+        return job.get('misfire_policy') or self.settings['misfire_policy']
+
+    def is_misfire(self, job, now):
+        """True if the job should have fired longer ago than the misfire grace period"""
+        # Measured from the jittered fire time, not the slot: a run that jitter
+        # pushed past the grace period is still on time
+        fires_at = datetime.fromisoformat(job['next_run'])
+        return (now - fires_at).total_seconds() > self.settings['misfire_grace_seconds']
+
+    def skip_missed_run(self, job, now):
+        """'skip' policy: move a missed job to its next future slot without running it"""
+        slot = datetime.fromisoformat(job.get('slot') or job['next_run'])
+        upcoming = next_slot(job, slot, now)
+        with self._lock:
+            missed_run = job['next_run']
+            self._set_next_run(job, upcoming)
+            job['status'] = 'scheduled' if upcoming else 'missed'
+
+        if self.cluster:
+            # Only one daemon may skip it; the others reload the row
+            if not self.store.claim(job, self.node_id, missed_run, now.timestamp(), self.settings['lease_seconds']):
+                self.refresh_job(job['id'])
+                return
+            self.store.release(job, self.node_id)
+        else:
+            self.save_job(job)
+
+        self.journal.record(job['id'], job['type'], slot, None, None, 'skipped')
+        self._push_timer(job)
+        print(f"Job {job['id']} missed its run at {slot.strftime('%H:%M:%S')}, skipped")
 
-    def add_job(self, job_type, args, schedule_time=None, interval=None, daily=False):
+    def add_job(self, job_type, args, schedule_time=None, interval=None, daily=False,
+                misfire_policy=None, jitter=None, timeout=None):
         """Add a new scheduled job with IST timezone support"""
         # Get times in both UTC and IST
-        utc_now = datetime.now()
+        import pytz  # Only needed here; keeps it off the import path of other commands
+
+        utc_now = self.clock()
         ist = pytz.timezone('Asia/Kolkata')
-        ist_now = datetime.now(ist).replace(tzinfo=None)  # Remove timezone info for comparison
+        # From the scheduler's clock too, so a simulated clock moves both
+        ist_now = pytz.utc.localize(utc_now).astimezone(ist).replace(tzinfo=None)
 
         job = {
-            'id': self.job_counter,
+            'id': None,
             'type': job_type,
             'args': args,
             'schedule_time': schedule_time,
@@ -67,10 +272,16 @@ class JobScheduler:
             'next_run': None,
             'status': 'scheduled'
         }
+        if misfire_policy:
+            job['misfire_policy'] = misfire_policy
+        if jitter is not None:
+            job['jitter'] = jitter
+        if timeout:
+            job['timeout'] = timeout
 
         # Calculate next run time
         if interval:
-            next_run = utc_now + timedelta(minutes=interval)
+            self._set_next_run(job, utc_now + timedelta(minutes=interval))
         elif schedule_time:
             hour, minute = map(int, schedule_time.split(':'))
 
@@ -93,11 +304,13 @@ class JobScheduler:
                     else:
                         utc_target += timedelta(days=1)
 
-            job['next_run'] = utc_target.isoformat()
+            self._set_next_run(job, utc_target)
 
-        self.jobs.append(job)
-        self.job_counter += 1
-        self.save_jobs()
+        self.store.add(job)
+        if self.daemon_running:
+            with self._lock:
+                self.jobs[job['id']] = job
+            self._push_timer(job)
 
         print(f"Job {job['id']} scheduled for {job_type}")
 
@@ -117,14 +330,16 @@ class JobScheduler:
 
     def remove_job(self, job_id):
         """Remove a single scheduled job"""
-        original_count = len(self.jobs)
-        self.jobs = [job for job in self.jobs if job.get('id') != job_id]
+        removed = self.store.remove(job_id)
+        with self._lock:
+            self.jobs.pop(job_id, None)
+            self._wakeup.set()
 
-        if len(self.jobs) < original_count:
-            self.save_jobs()
+        if removed:
             print(f"Job {job_id} removed")
         else:
             print(f"Job {job_id} not found")
+        return removed
 
     def remove_multiple_jobs(self, job_ids):
         """Remove multiple jobs at once"""
@@ -132,17 +347,18 @@ class JobScheduler:
         not_found = []
 
         for job_id in job_ids:
-            original_count = len(self.jobs)
-            self.jobs = [job for job in self.jobs if job.get('id') != job_id]
-
-            if len(self.jobs) < original_count:
+            if self.store.remove(job_id):
                 removed_count += 1
                 print(f"Job {job_id} removed")
             else:
                 not_found.append(job_id)
 
+        with self._lock:
+            for job_id in job_ids:
+                self.jobs.pop(job_id, None)
+            self._wakeup.set()
+
         if removed_count > 0:
-            self.save_jobs()
             print(f"Successfully removed {removed_count} jobs")
 
         if not_found:
@@ -150,136 +366,443 @@ class JobScheduler:
 
     def clear_all_jobs(self):
         """Remove all scheduled jobs"""
-        job_count = len(self.jobs)
-        self.jobs = []
-        self.save_jobs()
+        job_count = self.store.clear()
+        with self._lock:
+            self.jobs = {}
+            self._timers = []
+            self._wakeup.set()
         print(f"Cleared all {job_count} jobs")
+        return job_count
 
     def list_jobs(self):
         """List all scheduled jobs"""
-        if not self.jobs:
+        if not self.store.count():
             print("No scheduled jobs found")
             return
 
-        print("\nScheduled Jobs:")
-        print("-" * 70)
-        print(f"{'ID':<4} {'Type':<10} {'Schedule':<15} {'Next Run':<15} {'Status':<10}")
-        print("-" * 70)
-
-        current_time = datetime.now()
-
-        for job in self.jobs:
-            job_id = str(job.get('id', 'N/A'))
-            job_type = str(job.get('type', 'N/A'))
-            job_status = str(job.get('status', 'N/A'))
+        print_job_table(self.store.iter_jobs())
+
+    def get_job(self, job_id):
+        """Return a job from the live index, falling back to the store"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job:
+                return dict(job)
+        return self.store.get(job_id)
+
+    def snapshot_jobs(self):
+        """Copies of every job, from memory when the daemon is running"""
+        if not self.daemon_running:
+            return self.store.load_all()
+        with self._lock:
+            return [dict(self.jobs[job_id]) for job_id in sorted(self.jobs)]
+
+    def pause_job(self, job_id):
+        """Stop a scheduled job from firing until it is resumed"""
+        with self._lock:
+            job = self.jobs.get(job_id) or self.store.get(job_id)
+            if not job:
+                print(f"Job {job_id} not found")
+                return False
+            if job.get('status') != 'scheduled':
+                print(f"Job {job_id} is {job.get('status')}, only scheduled jobs can be paused")
+                return False
+            job['status'] = 'paused'
+            self._wakeup.set()
+
+        self.save_job(job)
+        print(f"Job {job_id} paused")
+        return True
+
+    def resume_job(self, job_id):
+        """Put a paused job back on the schedule"""
+        with self._lock:
+            job = self.jobs.get(job_id) or self.store.get(job_id)
+            if not job:
+                print(f"Job {job_id} not found")
+                return False
+            if job.get('status') != 'paused':
+                print(f"Job {job_id} is not paused")
+                return False
+            job['status'] = 'scheduled'
+
+        self.save_job(job)
+        self._push_timer(job)
+        print(f"Job {job_id} resumed")
+        return True
+
+    def exec_class(self, job):
+        """'cpu' jobs run in a worker process, everything else on a thread"""
+        if job.get('exec_class'):
+            return job['exec_class']
+        return 'cpu' if job['type'] in self.settings['cpu_job_types'] else 'io'
+
+    def job_timeout(self, job):
+        """Wall-clock limit in seconds for one run of the job"""
+        timeouts = self.settings['job_timeouts']
+        return job.get('timeout') or timeouts.get(job['type'], timeouts.get('default'))
+
+    def finish_job(self, job, scheduled_for, outcome, error, started):
+        """Record a finished run and work out when the job runs next"""
+        if outcome == 'cancelled':
+            self.cancel_run(job)
+            return
+        started_dt = datetime.fromtimestamp(started)
 
-            # Schedule info
-            if job.get('daily') and job.get('schedule_time'):
-                schedule_info = f"Daily {job.get('schedule_time', 'N/A')}"
-            elif job.get('interval'):
-                schedule_info = f"Every {job.get('interval', 'N/A')}min"
+        with self._lock:
+            job['last_run'] = started_dt.isoformat()
+            if outcome == 'failed':
+                job['status'] = 'failed'
             else:
-                schedule_info = "One-time"
-
-            # Next run
-            next_run_str = "N/A"
-            if job.get('next_run'):
-                try:
-                    next_run_dt = datetime.fromisoformat(job['next_run'])
-                    next_run_str = next_run_dt.strftime('%H:%M:%S')
-
-                    if next_run_dt <= current_time and job_status == 'scheduled':
-                        next_run_str += " (DUE)"
-                except:
-                    next_run_str = "Invalid"
+                # Recurring jobs carry on after a timeout; the next slot keeps the original cadence
+                slot_iso = job.get('slot') or scheduled_for
+                slot = datetime.fromisoformat(slot_iso) if slot_iso else started_dt
+                upcoming = next_slot(job, slot, self.clock(), catch_up=self.misfire_policy(job) == 'all')
+                self._set_next_run(job, upcoming)
+                if upcoming:
+                    job['status'] = 'scheduled'
+                else:
+                    job['status'] = 'completed' if outcome == 'ok' else outcome
 
-            print(f"{job_id:<4} {job_type:<10} {schedule_info:<15} {next_run_str:<15} {job_status:<10}")
+        if outcome == 'ok':
+            print(f"Job {job['id']} completed successfully")
+        else:
+            print(f"Job {job['id']} {outcome}: {error}")
 
-        print(f"\nCurrent time: {current_time.strftime('%H:%M:%S')}")
+        self.journal.record(job['id'], job['type'], scheduled_for, started, self.clock().timestamp(), outcome, error)
 
-    def execute_job(self, job):
-        """Execute a scheduled job"""
-        try:
-            print(f"\nExecuting job {job['id']} - {job['type']}")
-            job['status'] = 'running'
-            job['last_run'] = datetime.now().isoformat()
-
-            if job['type'] == 'rename':
-                file_ops.rename_files(job['args']['path'], job['args']['prefix'])
-            elif job['type'] == 'yt':
-                youtube_ops.download_video(job['args']['url'], job['args'].get('path', '.'))
-            elif job['type'] == 'pdfmerge':
-                pdf_ops.merge_pdfs(job['args']['path'], job['args'].get('output', 'merged.pdf'))
-            elif job['type'] == 'sortemail':
-                email_ops.sort_emails_by_sender(job['args']['sender'])
-            elif job['type'] == 'fetch':
-                result = web_ops.pretty_fetch(job['args']['url'], job['args'].get('lines', 20))
-                print(result)
-
-            # Schedule next run for recurring jobs
-            if job.get('daily') and job.get('schedule_time'):
-                hour, minute = map(int, job['schedule_time'].split(':'))
-                next_run = datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0) + timedelta(days=1)
-                job['next_run'] = next_run.isoformat()
-                job['status'] = 'scheduled'
-            elif job.get('interval'):
-                next_run = datetime.now() + timedelta(minutes=job['interval'])
-                job['next_run'] = next_run.isoformat()
+        if self.cluster:
+            with self._lock:
+                self._leased.discard(job['id'])
+            if not self.store.release(job, self.node_id):
+                logging.warning(f"Lost the lease on job {job['id']}; another daemon took it over")
+                self.refresh_job(job['id'])
+                return
+        else:
+            self.save_job(job)
+        self._push_timer(job)
+
+    def cancel_run(self, job):
+        """
+        Put back a job the executor dropped at shutdown before it started.
+        next_run still holds the missed slot, so after a restart the misfire
+        policy decides whether it runs.
+        """
+        with self._lock:
+            job['status'] = 'scheduled'
+        if self.cluster:
+            with self._lock:
+                self._leased.discard(job['id'])
+            self.store.release(job, self.node_id)
+        else:
+            self.save_job(job)
+        print(f"Job {job['id']} didn't start before shutdown; it stays scheduled")
+
+    def recover_interrupted_jobs(self):
+        """
+        Reschedule jobs left 'running' by a daemon that exited mid-run.
+        Only without cluster mode: there a running job may belong to another
+        daemon, and expired leases are taken over instead.
+        """
+        with self._lock:
+            stale = [job for job in self.jobs.values() if job.get('status') == 'running']
+            for job in stale:
                 job['status'] = 'scheduled'
-            else:
-                job['next_run'] = None
-                job['status'] = 'completed'
+        for job in stale:
+            self.save_job(job)
+            self._push_timer(job)
+            print(f"Job {job['id']} was interrupted by the last shutdown; rescheduled")
+        return len(stale)
+
+    def show_stats(self):
+        """Print dispatch lag and run duration percentiles per job type"""
+        stats = compute_stats(self.journal.iter_records())
+        if not stats:
+            print("No job runs recorded yet")
+            return
 
-            print(f"Job {job['id']} completed successfully")
+        def fmt(seconds):
+            return "-" if seconds is None else f"{seconds:.2f}s"
+
+        print("\nJob Run Statistics:")
+        print("-" * 94)
+        print(f"{'Type':<10} {'Runs':>6} {'Failed':>7} {'Skipped':>8} "
+              f"{'Lag p50':>9} {'p95':>9} {'p99':>9} {'Dur p50':>9} {'p95':>9} {'p99':>9}")
+        print("-" * 94)
+
+        for job_type, row in sorted(stats.items()):
+            outcomes = row['outcomes']
+            # A skipped misfire never ran, so it is neither a run nor a failure
+            skipped = outcomes.get('skipped', 0)
+            failed = outcomes.get('failed', 0) + outcomes.get('timeout', 0)
+            lag, duration = row['lag'], row['duration']
+            print(f"{job_type:<10} {row['runs'] - skipped:>6} {failed:>7} {skipped:>8} "
+                  f"{fmt(lag['p50']):>9} {fmt(lag['p95']):>9} {fmt(lag['p99']):>9} "
+                  f"{fmt(duration['p50']):>9} {fmt(duration['p95']):>9} {fmt(duration['p99']):>9}")
+
+    def stop(self):
+        """Ask the daemon loop to exit and wake it if it is sleeping"""
+        self.daemon_running = False
+        self._wakeup.set()
+
+    def refresh_job(self, job_id):
+        """Replace the in-memory copy of a job with what the store holds now"""
+        fresh = self.store.get(job_id)
+        with self._lock:
+            if fresh:
+                self.jobs[job_id] = fresh
+            else:
+                self.jobs.pop(job_id, None)
+        if fresh:
+            self._push_timer(fresh)
+
+    def claim_job(self, job, scheduled_for):
+        """Cluster mode: take the lease on a due job before running it"""
+        now = self.clock().timestamp()
+        if self.store.claim(job, self.node_id, scheduled_for, now, self.settings['lease_seconds']):
+            with self._lock:
+                self._leased.add(job['id'])
+            return True
+
+        # Another daemon got there first (or the job was removed/paused)
+        self.refresh_job(job['id'])
+        return False
+
+    def sync_cluster(self):
+        """
+        Cluster mode housekeeping, run every cluster_poll_seconds:
+        renew our leases, pick up jobs other daemons added or rescheduled,
+        and return jobs whose owner stopped renewing (crashed) for takeover.
+        """
+        now = self.clock()
+        poll = self.settings['cluster_poll_seconds']
+
+        with self._lock:
+            leased = list(self._leased)
+        if leased:
+            held = self.store.renew_leases(leased, self.node_id, now.timestamp() + self.settings['lease_seconds'])
+            with self._lock:
+                # A run that finished meanwhile released its lease itself (finish_job
+                # drops it from _leased first); only a lease we still hold can be lost
+                lost = (set(leased) - set(held)) & self._leased
+            for job_id in lost:
+                logging.warning(f"Lease on job {job_id} was taken over by another daemon")
+
+        horizon = (now + timedelta(seconds=poll)).isoformat()
+        for row in self.store.due_jobs(horizon, limit=1000):
+            with self._lock:
+                current = self.jobs.get(row['id'])
+                if current is not None and current.get('status') == row['status'] \
+                        and current.get('next_run') == row['next_run']:
+                    continue
+                if self.executor.is_in_flight(row['id']):
+                    continue
+                self.jobs[row['id']] = row
+            self._push_timer(row)
+
+        orphans = []
+        for row in self.store.expired_leases(now.timestamp()):
+            if self.executor.is_in_flight(row['id']):
+                continue
+            with self._lock:
+                self.jobs[row['id']] = row
+            orphans.append(row)
+        return orphans
+
+    def dispatch_job(self, job, takeover=False):
+        """Hand a due job to the worker pool, marking it running right away"""
+        with self._lock:
+            # It may have been removed or paused while waiting for a catch-up token.
+            # A takeover picks up a job left 'running' by a daemon that died.
+            if self.jobs.get(job['id']) is not job or job.get('status') != ('running' if takeover else 'scheduled'):
+                return False
+            scheduled_for = job.get('next_run')
+            job['status'] = 'running'
 
-        except Exception as e:
-            job['status'] = 'failed'
-            print(f"Job {job['id']} failed: {e}")
+        if self.cluster:
+            if not self.claim_job(job, scheduled_for):
+                return False
+        else:
+            self.save_job(job)
+
+        accepted = self.executor.submit(
+            job['id'], job['type'], run_operation, job['type'], job['args'],
+            on_done=lambda outcome, error, started: self.finish_job(job, scheduled_for, outcome, error, started),
+            exec_class=self.exec_class(job),
+            timeout=self.job_timeout(job)
+        )
+        if not accepted:
+            # A run that timed out but whose thread hasn't returned yet still holds the job
+            logging.warning(f"Job {job['id']} is still running, skipping this run")
+            self.skip_busy_run(job, scheduled_for)
+        return accepted
+
+    def skip_busy_run(self, job, scheduled_for):
+        """Move a job whose previous run is still going on to its next slot"""
+        with self._lock:
+            slot = datetime.fromisoformat(job.get('slot') or scheduled_for)
+            self._set_next_run(job, next_slot(job, slot, self.clock()))
+            job['status'] = 'scheduled' if job['next_run'] else 'missed'
+
+        if self.cluster:
+            with self._lock:
+                self._leased.discard(job['id'])
+            self.store.release(job, self.node_id)
+        else:
+            self.save_job(job)
+        self.journal.record(job['id'], job['type'], scheduled_for, None, None, 'skipped')
+        self._push_timer(job)
 
-        self.save_jobs()
+    def prepare_daemon(self, executor=None):
+        """Load jobs and set up the worker pool; run_daemon calls this first"""
+        self.daemon_running = True
+        self.load_jobs()
+        if not self.cluster:
+            self.recover_interrupted_jobs()
+        self.executor = executor or JobExecutor(
+            max_workers=self.settings['max_workers'],
+            type_limits=self.settings['type_limits'],
+            cpu_workers=self.settings['cpu_workers'],
+            clock=lambda: self.clock().timestamp()
+        )
+        self._catchup_limiter = TokenBucket(self.settings['catchup_rate'])
+
+    def run_pending(self):
+        """
+        Dispatch everything that is due right now.
+
+        Returns:
+            float: seconds until there may be more work (capped at MAX_IDLE_WAIT),
+            or 0 if jobs were dispatched and the queue should be checked again
+        """
+        orphans = []
+        if self.cluster:
+            if self._last_cluster_sync is None or \
+                    time.monotonic() - self._last_cluster_sync >= self.settings['cluster_poll_seconds']:
+                self._last_cluster_sync = time.monotonic()
+                orphans = self.sync_cluster()
+            for job in orphans:
+                print(f"Taking over job {job['id']} from a daemon that stopped responding")
+                self.dispatch_job(job, takeover=True)
+
+        on_time, missed, catchup = [], [], []
+        with self._lock:
+            current_time = self.clock()
+            for job in self._pop_due_jobs(current_time):
+                if not self.is_misfire(job, current_time):
+                    on_time.append(job)
+                elif self.misfire_policy(job) == 'skip':
+                    missed.append(job)
+                else:
+                    # Overdue after downtime: run, but no faster than catchup_rate
+                    self._catchup.append(job)
+
+            while self._catchup and self._catchup_limiter.try_take():
+                catchup.append(self._catchup.popleft())
+
+            if not (on_time or missed or catchup):
+                wait_for = self._seconds_until_next(current_time)
+                if wait_for is None or wait_for > MAX_IDLE_WAIT:
+                    wait_for = MAX_IDLE_WAIT
+                if self._catchup:
+                    wait_for = min(wait_for, self._catchup_limiter.seconds_until_token())
+                if self.cluster:
+                    wait_for = min(wait_for, self.settings['cluster_poll_seconds'])
+                return wait_for
+
+        for job in missed:
+            self.skip_missed_run(job, current_time)
+
+        for job in on_time + catchup:
+            print(f"Running job {job['id']} now")
+            self.dispatch_job(job)
+        return 0
 
     def run_daemon(self):
         """Run the scheduler daemon"""
-        self.daemon_running = True
-        print(f"Scheduler started at: {datetime.now().strftime('%H:%M:%S')}")
+        self.prepare_daemon()
+        control = ControlServer(self, self.settings['control_socket'])
+        control.start()
+        print(f"Scheduler started at: {self.clock().strftime('%H:%M:%S')}")
 
         def signal_handler(signum, frame):
-            self.daemon_running = False
+            self.stop()
 
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
 
         while self.daemon_running:
             try:
-                current_time = datetime.now()
+                # Clear before looking at the queue so a job added meanwhile still wakes us
+                self._wakeup.clear()
+                wait_for = self.run_pending()
+                if wait_for and self.daemon_running:
+                    # Sleep until the earliest deadline; add/remove/stop wake us early
+                    self._wakeup.wait(wait_for)
 
-                for job in self.jobs:
-                    if job.get('status') != 'scheduled':
-                        continue
+            except Exception as e:
+                print(f"Daemon error: {e}")
+                time.sleep(30)
 
-                    if job.get('next_run'):
-                        try:
-                            next_run_time = datetime.fromisoformat(job['next_run'])
+        control.stop()
+        print("Waiting for running jobs to finish...")
+        # Timed-out jobs whose threads never returned are left behind (the threads are daemons)
+        abandoned = self.executor.shutdown(wait=True)
+        if abandoned:
+            print(f"Not waiting for {abandoned} timed-out job(s) that are still running")
+        self.journal.close()
+        print("Scheduler stopped")
 
-                            if current_time >= next_run_time:
-                                print(f"Running job {job['id']} now")
-                                thread = threading.Thread(target=self.execute_job, args=(job,))
-                                thread.daemon = True
-                                thread.start()
+def print_job_table(jobs):
+    """Print jobs (any iterable of job dicts) as a table"""
+    print("\nScheduled Jobs:")
+    print("-" * 70)
+    print(f"{'ID':<4} {'Type':<10} {'Schedule':<15} {'Next Run':<15} {'Status':<10}")
+    print("-" * 70)
+
+    current_time = datetime.now()
+
+    for job in jobs:
+        job_id = str(job.get('id', 'N/A'))
+        job_type = str(job.get('type', 'N/A'))
+        job_status = str(job.get('status', 'N/A'))
+
+        # Schedule info
+        if job.get('daily') and job.get('schedule_time'):
+            schedule_info = f"Daily {job.get('schedule_time', 'N/A')}"
+        elif job.get('interval'):
+            schedule_info = f"Every {job.get('interval', 'N/A')}min"
+        else:
+            schedule_info = "One-time"
 
-                        except:
-                            continue
+        # Next run
+        next_run_str = "N/A"
+        if job.get('next_run'):
+            try:
+                next_run_dt = datetime.fromisoformat(job['next_run'])
+                next_run_str = next_run_dt.strftime('%H:%M:%S')
 
-                time.sleep(5)  # Check every 5 seconds
+                if next_run_dt <= current_time and job_status == 'scheduled':
+                    next_run_str += " (DUE)"
+            except:
+                next_run_str = "Invalid"
 
-            except Exception as e:
-                print(f"Daemon error: {e}")
-                time.sleep(30)
+        print(f"{job_id:<4} {job_type:<10} {schedule_info:<15} {next_run_str:<15} {job_status:<10}")
 
-        print("Scheduler stopped")
+    print(f"\nCurrent time: {current_time.strftime('%H:%M:%S')}")
+
+_scheduler_instance = None
+
+def get_scheduler():
+    """The shared JobScheduler, created (and its job store opened) on first use"""
+    global _scheduler_instance
+    if _scheduler_instance is None:
+        _scheduler_instance = JobScheduler()
+    return _scheduler_instance
 
-# Global scheduler instance
-scheduler_instance = JobScheduler()
+def _daemon_request(cmd, params=None):
+    """Send a command to a running daemon; None means no daemon is listening"""
+    return send_command(cmd, params, path=load_scheduler_settings()['control_socket'])
 
 def schedule_job(args):
     """Schedule a new job"""
@@ -298,13 +821,18 @@ def schedule_job(args):
             raise ValueError("PDF merge job requires --path argument")
         job_args = {'path': args.path, 'output': args.output or 'merged.pdf'}
     elif args.job == 'sortemail':
-        if not args.sender:
-            raise ValueError("Email sort job requires --sender argument")
-        job_args = {'sender': args.sender}
+        # Without a sender the job applies every rule in the rules file
+        job_args = {'sender': args.sender} if args.sender else {'rules': args.rules}
     elif args.job == 'fetch':
         if not args.url:
             raise ValueError("Web fetch job requires --url argument")
         job_args = {'url': args.url, 'lines': args.lines}
+        if args.archive:
+            job_args['archive'] = True
+    elif args.job == 'watch':
+        if not args.url:
+            raise ValueError("Watch job requires --url argument")
+        job_args = {'url': args.url}
 
     if not any([args.time, args.interval, args.daily]):
         raise ValueError("Must specify --time, --interval, or --daily for scheduling")
@@ -312,35 +840,99 @@ def schedule_job(args):
     if args.daily and not args.time:
         raise ValueError("Daily jobs require --time argument")
 
-    scheduler_instance.add_job(
+    job = _daemon_request('add', {
+        'job_type': args.job,
+        'args': job_args,
+        'schedule_time': args.time,
+        'interval': args.interval,
+        'daily': args.daily,
+        'misfire_policy': args.misfire,
+        'jitter': args.jitter,
+        'timeout': args.timeout
+    })
+    if job is not None:
+        print(f"Job {job['id']} scheduled for {job['type']} on the running daemon")
+        if job.get('next_run'):
+            print(f"Next run: {job['next_run']}")
+        return
+
+    get_scheduler().add_job(
         job_type=args.job,
         args=job_args,
         schedule_time=args.time,
         interval=args.interval,
-        daily=args.daily
+        daily=args.daily,
+        misfire_policy=args.misfire,
+        jitter=args.jitter,
+        timeout=args.timeout
     )
 
 def list_jobs():
-    scheduler_instance.list_jobs()
+    jobs = _daemon_request('list')
+    if jobs is None:
+        get_scheduler().list_jobs()
+    elif not jobs:
+        print("No scheduled jobs found")
+    else:
+        print_job_table(jobs)
+
+def _report_bulk(results, action):
+    """Print the per-job outcome of a bulk daemon command"""
+    for job_id, done in results.items():
+        print(f"Job {job_id} {action}" if done else f"Job {job_id} not {action}")
 
 def remove_job(job_id):
     """Remove a single job or multiple jobs"""
-    if isinstance(job_id, list):
-        scheduler_instance.remove_multiple_jobs(job_id)
+    job_ids = job_id if isinstance(job_id, list) else [job_id]
+    results = _daemon_request('remove', {'ids': job_ids})
+    if results is not None:
+        _report_bulk(results, 'removed')
+    elif len(job_ids) > 1:
+        get_scheduler().remove_multiple_jobs(job_ids)
     else:
-        scheduler_instance.remove_job(job_id)
+        get_scheduler().remove_job(job_ids[0])
+
+def pause_jobs(job_ids):
+    """Pause one or more scheduled jobs"""
+    results = _daemon_request('pause', {'ids': job_ids})
+    if results is not None:
+        _report_bulk(results, 'paused')
+        return
+    for job_id in job_ids:
+        get_scheduler().pause_job(job_id)
+
+def resume_jobs(job_ids):
+    """Resume one or more paused jobs"""
+    results = _daemon_request('resume', {'ids': job_ids})
+    if results is not None:
+        _report_bulk(results, 'resumed')
+        return
+    for job_id in job_ids:
+        get_scheduler().resume_job(job_id)
 
 def clear_all_jobs():
     """Remove all scheduled jobs"""
-    scheduler_instance.clear_all_jobs()
+    count = _daemon_request('clear')
+    if count is not None:
+        print(f"Cleared all {count} jobs")
+        return
+    get_scheduler().clear_all_jobs()
+
+def show_stats():
+    """Print run statistics from the job run journal"""
+    get_scheduler().show_stats()
 
 def start_daemon():
+    configure_logging(load_logging_settings())
     print("Starting scheduler daemon...")
     print("Press Ctrl+C to stop")
     try:
-        scheduler_instance.run_daemon()
+        get_scheduler().run_daemon()
     except KeyboardInterrupt:
         print("\nScheduler stopped by user")
 
 def stop_daemon():
-    print("Use Ctrl+C to stop a running daemon")
+    if _daemon_request('stop') is None:
+        print("No running scheduler daemon found")
+    else:
+        print("Stop signal sent to scheduler daemon")
@@ -0,0 +1,21 @@
+import os
+import json
+import logging
+
+SETTINGS_FILE = 'config/settings.json'
+
+def load_settings_section(name, defaults, settings_file=SETTINGS_FILE):
+    """
+    One section of settings.json merged over its defaults.
+
+    A missing file or section gives the defaults; an unreadable file is
+    logged and gives the defaults too.
+    """
+    settings = dict(defaults)
+    try:
+        if os.path.exists(settings_file):
+            with open(settings_file, 'r') as f:
+                settings.update(json.load(f).get(name, {}))
+    except Exception as e:
+        logging.error(f"Error loading {name} settings: {e}")
+    return settings
@@ -0,0 +1,259 @@
+import os
+import json
+import zlib
+import difflib
+import sqlite3
+import hashlib
+from datetime import datetime
+from utils.web_ops import fetch_page, JSON_START, HTML_START, HTML_SNIFF_BYTES
+from utils.extract import extract_text, iter_json_lines, iter_text_lines, iter_chunks
+from utils.settings import SETTINGS_FILE, load_settings_section
+
+DEFAULT_WATCH_SETTINGS = {
+    'db': 'config/watch.db',
+    'snapshot_every': 20,  # Store a full copy every N versions so old ones rebuild quickly
+    'timeout': 30
+}
+
+def load_watch_settings(settings_file=SETTINGS_FILE):
+    return load_settings_section('watch', DEFAULT_WATCH_SETTINGS, settings_file)
+
+def normalize_lines(content, content_type=''):
+    """
+    The lines of a page that count as its content: visible text for HTML,
+    pretty-printed JSON, stripped non-blank lines otherwise. Markup and
+    whitespace changes therefore don't register as changes.
+    """
+    if 'json' in content_type or JSON_START.match(content):
+        try:
+            return list(iter_json_lines(iter_chunks(content)))
+        except ValueError:
+            pass
+    if 'html' in content_type or HTML_START.search(content, 0, HTML_SNIFF_BYTES):
+        return extract_text(iter_chunks(content))[1]
+    return [line.strip() for line in iter_text_lines(content) if line.strip()]
+
+def content_hash(lines):
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+def make_delta(old_lines, new_lines):
+    """
+    Edit script turning old_lines into new_lines: a list of
+    [start, end, replacement_lines] for each changed range of old_lines.
+    """
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [[i1, i2, new_lines[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+def apply_delta(old_lines, delta):
+    lines = []
+    position = 0
+    for start, end, replacement in delta:
+        lines.extend(old_lines[position:start])
+        lines.extend(replacement)
+        position = end
+    lines.extend(old_lines[position:])
+    return lines
+
+def _pack(data):
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'), 9)
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+class PageHistory:
+    """
+    Versions of watched pages in SQLite.
+
+    A version is only stored when the normalized content changes. Most
+    versions are a compressed delta against the one before; every
+    snapshot_every-th version is a full compressed copy, so rebuilding an
+    old version never replays more than that many deltas. The newest
+    version is also kept whole in `pages` so a check never rebuilds anything.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            raw_hash TEXT,
+            content_hash TEXT NOT NULL,
+            latest BLOB NOT NULL,
+            version INTEGER NOT NULL,
+            checks INTEGER NOT NULL DEFAULT 0,
+            last_checked TEXT,
+            last_changed TEXT
+        );
+        CREATE TABLE IF NOT EXISTS versions (
+            url TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            fetched_at TEXT NOT NULL,
+            kind TEXT NOT NULL,  -- 'full' or 'delta'
+            data BLOB NOT NULL,
+            added INTEGER NOT NULL,
+            removed INTEGER NOT NULL,
+            PRIMARY KEY (url, version)
+        );
+    """
+
+    def __init__(self, path='config/watch.db', snapshot_every=20):
+        self.snapshot_every = max(1, snapshot_every)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def record(self, url, content, content_type='', now=None):
+        """
+        Record one check of url.
+
+        Returns:
+            dict: 'changed', 'version', 'added' and 'removed' line counts
+        """
+        now = now or datetime.now().isoformat(timespec='seconds')
+        raw_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        row = self._conn.execute('SELECT raw_hash, content_hash, latest, version FROM pages WHERE url = ?',
+                                 (url,)).fetchone()
+
+        # Byte-identical body: nothing to parse or store
+        if row and row[0] == raw_hash:
+            self._touch(url, now)
+            return {'changed': False, 'version': row[3], 'added': 0, 'removed': 0}
+
+        lines = normalize_lines(content, content_type)
+        digest = content_hash(lines)
+        if row and row[1] == digest:
+            # Markup changed but the content didn't; remember the new body hash
+            self._conn.execute('UPDATE pages SET raw_hash = ? WHERE url = ?', (raw_hash, url))
+            self._touch(url, now)
+            return {'changed': False, 'version': row[3], 'added': 0, 'removed': 0}
+
+        version = row[3] + 1 if row else 1
+        delta = make_delta(_unpack(row[2]), lines) if row else [[0, 0, lines]]
+        added = sum(len(replacement) for _, _, replacement in delta)
+        removed = sum(end - start for start, end, _ in delta)
+        if (version - 1) % self.snapshot_every:
+            kind, data = 'delta', _pack(delta)
+        else:
+            kind, data = 'full', _pack(lines)
+
+        with self._conn:
+            self._conn.execute(
+                'INSERT INTO versions (url, version, content_hash, fetched_at, kind, data, added, removed) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, version, digest, now, kind, data, added, removed)
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages (url, raw_hash, content_hash, latest, version, checks, last_checked, last_changed) '
+                'VALUES (?, ?, ?, ?, ?, COALESCE((SELECT checks FROM pages WHERE url = ?), 0) + 1, ?, ?)',
+                (url, raw_hash, digest, _pack(lines), version, url, now, now)
+            )
+        return {'changed': True, 'version': version, 'added': added, 'removed': removed}
+
+    def _touch(self, url, now):
+        with self._conn:
+            self._conn.execute('UPDATE pages SET checks = checks + 1, last_checked = ? WHERE url = ?', (now, url))
+
+    def history(self, url):
+        """Stored versions of url, oldest first (without their content)"""
+        rows = self._conn.execute(
+            'SELECT version, fetched_at, kind, added, removed, length(data) FROM versions WHERE url = ? ORDER BY version',
+            (url,)
+        )
+        return [{'version': v, 'fetched_at': at, 'kind': kind, 'added': added, 'removed': removed, 'stored_bytes': size}
+                for v, at, kind, added, removed, size in rows]
+
+    def pages(self):
+        rows = self._conn.execute('SELECT url, version, checks, last_checked, last_changed FROM pages ORDER BY url')
+        return [{'url': url, 'versions': version, 'checks': checks, 'last_checked': checked, 'last_changed': changed}
+                for url, version, checks, checked, changed in rows]
+
+    def lines_at(self, url, version=None):
+        """Content lines of one version (the newest by default), or None if unknown"""
+        if version is None:
+            row = self._conn.execute('SELECT latest FROM pages WHERE url = ?', (url,)).fetchone()
+            return _unpack(row[0]) if row else None
+
+        base = self._conn.execute(
+            "SELECT MAX(version) FROM versions WHERE url = ? AND version <= ? AND kind = 'full'", (url, version)
+        ).fetchone()[0]
+        exists = self._conn.execute('SELECT 1 FROM versions WHERE url = ? AND version = ?', (url, version)).fetchone()
+        if base is None or not exists:
+            return None
+        lines = None
+        for kind, data in self._conn.execute(
+                'SELECT kind, data FROM versions WHERE url = ? AND version BETWEEN ? AND ? ORDER BY version',
+                (url, base, version)):
+            lines = _unpack(data) if kind == 'full' else apply_delta(lines, _unpack(data))
+        return lines
+
+    def close(self):
+        self._conn.close()
+
+def _open_history():
+    settings = load_watch_settings()
+    return PageHistory(settings['db'], settings['snapshot_every']), settings
+
+def check_page(url):
+    """Fetch url once and record a new version if its content changed"""
+    history, settings = _open_history()
+    try:
+        result = fetch_page(url, settings['timeout'], use_cache=False)
+        if not result['success']:
+            print(f"❌ Error fetching {url}: {result['error']}")
+            return None
+
+        outcome = history.record(url, result['content'], result['content_type'] or '')
+        if not outcome['changed']:
+            print(f"😴 No change: {url} (version {outcome['version']})")
+        elif outcome['version'] == 1:
+            print(f"📸 First snapshot of {url}: {outcome['added']} lines")
+        else:
+            print(f"🔔 Changed: {url} -> version {outcome['version']} "
+                  f"(+{outcome['added']} / -{outcome['removed']} lines)")
+        return outcome
+    finally:
+        history.close()
+
+def show_history(url=None):
+    """Print the change history of url, or a summary of every watched page"""
+    history, _ = _open_history()
+    try:
+        if url is None:
+            pages = history.pages()
+            if not pages:
+                print("No watched pages yet")
+            for page in pages:
+                print(f"👀 {page['url']}: {page['versions']} versions over {page['checks']} checks, "
+                      f"last change {page['last_changed']}")
+            return
+
+        versions = history.history(url)
+        if not versions:
+            print(f"No history for {url}")
+            return
+        print(f"{'Ver':<5} {'Fetched':<20} {'Change':<16} {'Stored':<14}")
+        print("-" * 58)
+        for v in versions:
+            change = f"+{v['added']} / -{v['removed']}"
+            stored = f"{v['stored_bytes']} ({v['kind']})"
+            print(f"{v['version']:<5} {v['fetched_at']:<20} {change:<16} {stored:<14}")
+    finally:
+        history.close()
+
+def show_version(url, version=None, diff=False):
+    """Print one stored version, or with diff=True what changed in it"""
+    history, _ = _open_history()
+    try:
+        lines = history.lines_at(url, version)
+        if lines is None:
+            print(f"❌ No such version of {url}")
+            return
+        if not diff:
+            print('\n'.join(lines))
+            return
+        version = version or history.history(url)[-1]['version']
+        previous = history.lines_at(url, version - 1) if version > 1 else []
+        for line in difflib.unified_diff(previous, lines, f"version {version - 1}", f"version {version}", lineterm=''):
+            print(line)
+    finally:
+        history.close()
@@ -1,15 +1,55 @@
 import requests
+import os
+import re
+import sys
 import json
-from bs4 import BeautifulSoup
+import time
+import hashlib
+import tempfile
+import itertools
 import urllib.parse
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
+from utils.http_client import get_session, get_cache
+from utils.extract import extract_text, iter_json_lines, iter_text_lines, iter_chunks
 
-def fetch_page(url: str, timeout: int = 10) -> dict:
+JSON_START = re.compile(r'\s*[{\[]')
+HTML_START = re.compile(r'<html', re.IGNORECASE)
+HTML_SNIFF_BYTES = 64 * 1024  # How far into untyped content to look for <html
+
+# Sent with every request so sites serve the same page a browser would get
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+def _cached_result(entry):
+    return {
+        'success': True,
+        'content': entry['body'].decode(entry['encoding'] or 'utf-8', errors='replace'),
+        'status_code': entry['status'],
+        'content_type': (entry['content_type'] or '').lower(),
+        'url': entry['final_url'],
+        'error': None,
+        'from_cache': True
+    }
+
+def fetch_page(url: str, timeout: int = 10, use_cache: bool = True) -> dict:
     """
     Fetch raw page content with comprehensive error handling
 
+    Responses are kept in the on-disk HTTP cache: fresh entries are served
+    without a request, stale ones are revalidated with If-None-Match /
+    If-Modified-Since and served from disk on 304 Not Modified.
+
     Returns:
-        dict: Contains 'success', 'content', 'error', 'status_code', 'content_type'
+        dict: Contains 'success', 'content', 'error', 'status_code', 'content_type', 'from_cache'
     """
     try:
         # Validate URL
@@ -18,18 +58,25 @@ def fetch_page(url: str, timeout: int = 10) -> dict:
             url = f"https://{url}"
 
         # Set headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
+        headers = dict(BROWSER_HEADERS)
+
+        cache = get_cache() if use_cache else None
+        entry = cache.lookup(url) if cache else None
+        if entry:
+            if entry['fresh']:
+                return _cached_result(entry)
+            headers.update(cache.conditional_headers(entry))
+
+        # Pooled session: repeat requests to a host reuse the open connection
+        response = get_session().get(url, timeout=timeout, headers=headers, verify=True)
+
+        if response.status_code == 304 and entry:
+            cache.refresh(url, response.headers)
+            return _cached_result(entry)
 
-        response = requests.get(url, timeout=timeout, headers=headers, verify=True)
         response.raise_for_status()
+        if cache:
+            cache.store(url, response)
 
         return {
             'success': True,
@@ -37,7 +84,8 @@ def fetch_page(url: str, timeout: int = 10) -> dict:
             'status_code': response.status_code,
             'content_type': response.headers.get('content-type', '').lower(),
             'url': response.url,
-            'error': None
+            'error': None,
+            'from_cache': False
         }
 
     except requests.exceptions.Timeout:
@@ -94,53 +142,38 @@ def pretty_fetch(url: str, lines: int = 20) -> str:
     output_lines = [
         f"📊 Fetch Results for: {url}",
         f"🕒 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        f"📋 Status: {result['status_code']} | Type: {content_type}",
+        f"📋 Status: {result['status_code']}{' (cached)' if result.get('from_cache') else ''} | Type: {content_type}",
         "=" * 60,
         ""
     ]
 
     try:
-        # Try JSON first
-        if 'json' in content_type or raw_content.strip().startswith(('{', '[')):
+        # Try JSON first; only as much is pretty-printed as will be shown
+        if 'json' in content_type or JSON_START.match(raw_content):
             try:
-                data = json.loads(raw_content)
-                pretty_json = json.dumps(data, indent=2, ensure_ascii=False)
-                content_lines = pretty_json.splitlines()
+                budget = max(0, lines - len(output_lines) - 2)
+                content_lines = list(itertools.islice(iter_json_lines(iter_chunks(raw_content)), budget))
                 output_lines.append("📄 Content Type: JSON")
                 output_lines.append("-" * 30)
-                output_lines.extend(content_lines[:lines-len(output_lines)])
+                output_lines.extend(content_lines)
                 return "\n".join(output_lines)
-            except json.JSONDecodeError:
+            except ValueError:
                 pass
 
-        # Try HTML
-        if 'html' in content_type or '<html' in raw_content.lower():
+        # Try HTML; the extractor stops parsing once it has enough lines
+        if 'html' in content_type or HTML_START.search(raw_content, 0, HTML_SNIFF_BYTES):
             try:
-                soup = BeautifulSoup(raw_content, "html.parser")
-
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.decompose()
-
-                # Get text and clean it up
-                text = soup.get_text(separator="\n")
-                clean_lines = []
-
-                for line in text.split('\n'):
-                    line = line.strip()
-                    if line and len(line) > 1:  # Skip empty lines and single chars
-                        clean_lines.append(line)
-
                 output_lines.append("📄 Content Type: HTML (text extracted)")
                 output_lines.append("-" * 30)
 
+                title, clean_lines = extract_text(iter_chunks(raw_content), max(0, lines - len(output_lines)))
+
                 # Add title if available
-                title = soup.find('title')
                 if title:
-                    output_lines.append(f"📌 Title: {title.get_text().strip()}")
+                    output_lines.append(f"📌 Title: {title}")
                     output_lines.append("")
 
-                output_lines.extend(clean_lines[:lines-len(output_lines)])
+                output_lines.extend(clean_lines[:max(0, lines - len(output_lines))])
                 return "\n".join(output_lines)
 
             except Exception as e:
@@ -152,55 +185,214 @@ def pretty_fetch(url: str, lines: int = 20) -> str:
         output_lines.append("📄 Content Type: Plain Text")
         output_lines.append("-" * 30)
 
-        text_lines = raw_content.splitlines()
-        remaining_lines = lines - len(output_lines)
-        output_lines.extend(text_lines[:remaining_lines])
+        remaining_lines = max(0, lines - len(output_lines))
+        output_lines.extend(itertools.islice(iter_text_lines(raw_content), remaining_lines))
 
         return "\n".join(output_lines)
 
     except Exception as e:
         return f"❌ Error processing content: {str(e)}"
 
-def save_content(url: str, filename: str = None) -> bool:
+def _format_bytes(count):
+    for unit in ('B', 'KB', 'MB'):
+        if count < 1024:
+            return f"{count:.0f}{unit}" if unit == 'B' else f"{count:.1f}{unit}"
+        count /= 1024
+    return f"{count:.1f}GB"
+
+def _download_to_part(url, part_path, meta_path, chunk_size, timeout):
     """
-    Save fetched content to a file
+    One download attempt into part_path, resuming from its current size.
+
+    Returns:
+        bool: True once the whole body is in part_path
     """
-    try:
-        result = fetch_page(url)
+    headers = dict(BROWSER_HEADERS)
+    headers['Accept-Encoding'] = 'identity'  # Byte ranges must refer to the raw file
 
-        if not result['success']:
-            print(f"❌ Failed to fetch content: {result['error']}")
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if offset and os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            validator = json.load(f).get('validator')
+        headers['Range'] = f"bytes={offset}-"
+        if validator:
+            # Only resume if the file is unchanged; otherwise the server sends it all
+            headers['If-Range'] = validator
+    else:
+        offset = 0
+
+    with get_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 416 and offset:
+            # Nothing left to send: the partial file is already complete
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            if total.isdigit() and int(total) == offset:
+                return True
+            os.remove(part_path)
             return False
+        response.raise_for_status()
+
+        if response.status_code == 206 and response.headers.get('Content-Range', '').startswith(f"bytes {offset}-"):
+            mode = 'ab'
+            print(f"↩️  Resuming at {_format_bytes(offset)}")
+        else:
+            mode, offset = 'wb', 0
+            with open(meta_path, 'w') as f:
+                json.dump({'url': url, 'validator': response.headers.get('ETag') or response.headers.get('Last-Modified')}, f)
+
+        length = response.headers.get('Content-Length')
+        total = offset + int(length) if length and length.isdigit() else None
+
+        done = offset
+        started = last_report = time.perf_counter()
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                done += len(chunk)
 
-        if not filename:
-            # Generate filename from URL
-            parsed = urllib.parse.urlparse(url)
-            domain = parsed.netloc.replace('www.', '')
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{domain}_{timestamp}.txt"
+                now = time.perf_counter()
+                if now - last_report >= 0.5:
+                    last_report = now
+                    rate = (done - offset) / (now - started)
+                    progress = f"{done / total:6.1%} of {_format_bytes(total)}" if total else _format_bytes(done)
+                    print(f"\r⬇️  {progress}  {_format_bytes(rate)}/s   ", end='', flush=True)
+            f.flush()
+            os.fsync(f.fileno())
 
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(result['content'])
+        elapsed = time.perf_counter() - started
+        rate = (done - offset) / elapsed if elapsed > 0 else 0
+        print(f"\r⬇️  {_format_bytes(done)} in {elapsed:.1f}s ({_format_bytes(rate)}/s)          ")
 
-        print(f"💾 Content saved to: {filename}")
+        if total is not None and done < total:
+            raise requests.exceptions.ChunkedEncodingError(f"Connection closed after {done} of {total} bytes")
         return True
 
-    except Exception as e:
-        print(f"❌ Error saving content: {e}")
-        return False
+def save_content(url: str, filename: str = None, chunk_size: int = 64 * 1024,
+                 attempts: int = 3, timeout: int = 30) -> bool:
+    """
+    Download a URL to a file, streaming it in chunks
+
+    Memory use stays flat whatever the size. The body goes to <filename>.part
+    and is renamed into place only when complete. If the connection drops,
+    the next attempt (or a later call) resumes from the partial file with a
+    Range request, provided the server's ETag/Last-Modified is unchanged.
+
+    Without a filename the response is appended to the web archive instead
+    (unless 'save_unnamed' is turned off in the archive settings).
+    """
+    parsed = urllib.parse.urlparse(url)
+    if not parsed.scheme:
+        url = f"https://{url}"
+        parsed = urllib.parse.urlparse(url)
+
+    if not filename:
+        from utils.archive import load_archive_settings
+        archive_settings = load_archive_settings()
+        if archive_settings['save_unnamed']:
+            return archive_content(url, chunk_size, attempts, timeout, archive_settings) is not None
+
+        # Generate filename from URL
+        domain = parsed.netloc.replace('www.', '')
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"{domain}_{timestamp}.txt"
+
+    part_path = f"{filename}.part"
+    meta_path = f"{filename}.part.json"
+
+    for attempt in range(1, attempts + 1):
+        try:
+            if _download_to_part(url, part_path, meta_path, chunk_size, timeout):
+                os.replace(part_path, filename)
+                if os.path.exists(meta_path):
+                    os.remove(meta_path)
+                print(f"💾 Content saved to: {filename}")
+                return True
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            print(f"\n⚠️  Download interrupted (attempt {attempt}/{attempts}): {e}")
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Failed to fetch content: HTTP Error {e.response.status_code}: {e.response.reason}")
+            return False
+        except Exception as e:
+            print(f"❌ Error saving content: {e}")
+            return False
+
+    if os.path.exists(part_path):
+        print(f"💡 Partial download kept in {part_path}; run again to resume")
+    return False
 
-def check_url_status(url: str) -> dict:
+def archive_content(url: str, chunk_size: int = 64 * 1024, attempts: int = 3, timeout: int = 30,
+                    settings: dict = None):
+    """
+    Fetch a URL and append the response to the segmented web archive
+
+    The body is streamed into a spool file (in memory up to 8MB, then on
+    disk) so the archive record can be written with its length up front.
+    Error responses (4xx/5xx) are archived too, but count as a failure.
+
+    Returns:
+        int: capture id, or None on failure
+    """
+    from utils.archive import open_archive
+
+    for attempt in range(1, attempts + 1):
+        try:
+            with get_session().get(url, headers=BROWSER_HEADERS, timeout=timeout, stream=True) as response, \
+                    tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+                digest = hashlib.sha1()
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    spool.write(chunk)
+                    digest.update(chunk)
+                size = spool.tell()
+                spool.seek(0)
+
+                capture_id = open_archive(settings).add(
+                    url, response.status_code, response.reason, response.raw.headers.items(),
+                    iter(lambda: spool.read(chunk_size), b''), size, digest.hexdigest()
+                )
+            if response.status_code >= 400:
+                print(f"❌ Failed to fetch content: HTTP Error {response.status_code}: {response.reason} "
+                      f"(archived as capture {capture_id})")
+                return None
+            print(f"📦 Archived {url} as capture {capture_id} ({_format_bytes(size)}, HTTP {response.status_code})")
+            return capture_id
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            print(f"⚠️  Fetch interrupted (attempt {attempt}/{attempts}): {e}")
+        except Exception as e:
+            print(f"❌ Error archiving content: {e}")
+            return None
+    return None
+
+def check_url_status(url: str, timeout: int = 5, allow_redirects: bool = False) -> dict:
     """
     Quick URL status check without fetching full content
+
+    Uses HEAD; servers that don't allow HEAD (405/501) get a GET for the
+    first byte only (Range: bytes=0-0) instead. An empty resource has no
+    first byte (416), so that is retried as a plain GET.
     """
     try:
-        response = requests.head(url, timeout=5)
+        session = get_session()
+        method = 'HEAD'
+        response = session.head(url, timeout=timeout, allow_redirects=allow_redirects)
+        if response.status_code in (405, 501):
+            method = 'GET'
+            with session.get(url, timeout=timeout, allow_redirects=allow_redirects, stream=True,
+                             headers={'Range': 'bytes=0-0', 'Accept-Encoding': 'identity'}) as response:
+                pass  # Closing without reading the body drops at most one chunk
+            if response.status_code == 416:
+                with session.get(url, timeout=timeout, allow_redirects=allow_redirects, stream=True) as response:
+                    pass
+
         return {
             'url': url,
             'status_code': response.status_code,
             'accessible': response.status_code < 400,
             'content_type': response.headers.get('content-type', 'unknown'),
-            'content_length': response.headers.get('content-length', 'unknown')
+            'content_length': response.headers.get('content-length', 'unknown'),
+            'method': method
         }
     except Exception as e:
         return {
@@ -209,3 +401,110 @@ def check_url_status(url: str) -> dict:
             'accessible': False,
             'error': str(e)
         }
+
+def map_per_host(fn, urls, concurrency: int = 8, per_host_limit: int = 2):
+    """
+    Run fn(url) on a thread pool, yielding (url, result) as each call finishes.
+
+    At most `concurrency` calls run at once and at most `per_host_limit` per
+    host; a busy host never holds up URLs for other hosts. urls may be any
+    iterable (e.g. lines of a file) and is read only a little ahead.
+    """
+    # Checked here rather than in the generator, so a bad value fails at the call
+    if concurrency < 1 or per_host_limit < 1:
+        raise ValueError(f"concurrency and per_host_limit must be at least 1 "
+                         f"(got {concurrency} and {per_host_limit})")
+    return _map_per_host(fn, iter(urls), concurrency, per_host_limit)
+
+def _map_per_host(fn, urls, concurrency, per_host_limit):
+    exhausted = False
+    read_ahead = concurrency * 4
+
+    waiting = OrderedDict()  # host -> deque of URLs not started yet
+    waiting_count = 0
+    active_by_host = {}
+    running = {}  # future -> (url, host)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='godtool-fetch') as pool:
+        while True:
+            # Top up the buffer of URLs waiting for a slot
+            while not exhausted and waiting_count < read_ahead:
+                url = next(urls, None)
+                if url is None:
+                    exhausted = True
+                    break
+                url = url.strip()
+                if not url or url.startswith('#'):
+                    continue
+                host = urllib.parse.urlparse(url if '://' in url else f"https://{url}").netloc.lower()
+                waiting.setdefault(host, deque()).append(url)
+                waiting_count += 1
+
+            # Start URLs from hosts that are below their limit, round-robin
+            for host in list(waiting):
+                if len(running) >= concurrency:
+                    break
+                queue = waiting[host]
+                while queue and len(running) < concurrency and active_by_host.get(host, 0) < per_host_limit:
+                    url = queue.popleft()
+                    waiting_count -= 1
+                    active_by_host[host] = active_by_host.get(host, 0) + 1
+                    running[pool.submit(fn, url)] = (url, host)
+                if queue:
+                    waiting.move_to_end(host)  # Give the other hosts a turn first next time
+                else:
+                    del waiting[host]
+
+            if not running:
+                if exhausted and not waiting_count:
+                    return
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, host = running.pop(future)
+                active_by_host[host] -= 1
+                yield url, future.result()
+
+def fetch_many(urls, concurrency: int = 8, per_host_limit: int = 2, timeout: int = 10):
+    """
+    Fetch many URLs concurrently, yielding (url, result) as each one finishes.
+
+    result has fetch_page's shape plus 'elapsed' (seconds); concurrency and
+    per-host limits work as in map_per_host.
+    """
+    def timed_fetch(url):
+        started = time.perf_counter()
+        result = fetch_page(url, timeout=timeout)
+        result['elapsed'] = round(time.perf_counter() - started, 3)
+        return result
+
+    return map_per_host(timed_fetch, urls, concurrency, per_host_limit)
+
+def batch_fetch(source: str, concurrency: int = 8, per_host_limit: int = 2):
+    """
+    Fetch every URL listed in a file (one per line, '-' for stdin) and print
+    one status line per URL as it completes.
+    """
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    started = time.perf_counter()
+    ok = failed = 0
+
+    try:
+        print(f"🌐 Fetching URLs from {'stdin' if source == '-' else source} "
+              f"({concurrency} at a time, {per_host_limit} per host)")
+        for url, result in fetch_many(stream, concurrency=concurrency, per_host_limit=per_host_limit):
+            if result['success']:
+                ok += 1
+                size_kb = len(result['content'] or '') / 1024
+                cached = ' (cached)' if result.get('from_cache') else ''
+                print(f"✅ {result['status_code']} {size_kb:8.1f}KB {result['elapsed']:6.2f}s  {url}{cached}")
+            else:
+                failed += 1
+                print(f"❌ {result['elapsed']:6.2f}s  {url}: {result['error']}")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    print(f"\n✨ {ok} fetched, {failed} failed in {time.perf_counter() - started:.2f}s")
+    return failed == 0